@@ -1,17 +1,30 @@
 import os
 import argparse
+import json
+import uuid
+from collections import defaultdict
 from datetime import timedelta, datetime, timezone
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
 from passlib.hash import bcrypt
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from compression import Compress
+from db_routing import ReplicaRouter, RoutingSession
+from http_cache import HttpCache, conditional_response
+from load_control import LoadControl, check_deadline
+from rate_limit import RateLimiter
+from sharding import ShardRouter, shard_router, sharded_table, user_shard
 
 load_dotenv()
 
@@ -35,7 +48,7 @@ if cloud_name and api_key and api_secret:
 else:
     print("Warning: Cloudinary credentials not found. Image uploads will not work.")
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class User(db.Model):
@@ -45,17 +58,36 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     photo_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    contacts = db.relationship("Contact", backref="user", lazy=True, cascade="all, delete-orphan")
-    sent_messages = db.relationship("Message", foreign_keys="Message.sender_id", backref="sender", lazy=True)
-    received_messages = db.relationship("Message", foreign_keys="Message.recipient_id", backref="recipient", lazy=True)
+    # Set when the user asks for their account to be deleted; the purge job
+    # removes the row later, and until then the account is locked
+    deleted_at = db.Column(db.DateTime)
+    # Deleting a user is left to the database's ON DELETE CASCADE rules
+    # instead of loading every contact and message into the session first
+    contacts = db.relationship("Contact", backref="user", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    sent_messages = db.relationship(
+        "Message", foreign_keys="Message.sender_id", backref="sender", lazy=True,
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+    received_messages = db.relationship(
+        "Message", foreign_keys="Message.recipient_id", backref="recipient", lazy=True,
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Supports the prefix search behind the messaging recipient picker
+        db.Index("idx_user_name_lower", db.func.lower(name)),
+        # Never hand a deleted user's id to someone else: old tokens carry it
+        {"sqlite_autoincrement": True},
+    )
 
     def to_dict_basic(self):
         return {"id": self.id, "name": self.name, "email": self.email, "photo": self.photo_url}
 
 
+@sharded_table
 class Contact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(64))
@@ -67,8 +99,13 @@ class Contact(db.Model):
     access_count = db.Column(db.Integer, default=0, nullable=False)
     last_accessed = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
+    __table_args__ = (
+        db.Index("idx_contact_user_group", "user_id", "group"),
+    )
+
+    def to_dict(self, thumbnail_size=None):
         return {
             "id": self.id,
             "name": self.name,
@@ -82,20 +119,27 @@ class Contact(db.Model):
             "accessCount": self.access_count or 0,
             "lastAccessed": self.last_accessed.isoformat() if self.last_accessed else None,
             "createdAt": self.created_at.isoformat(),
+            "photoThumbnail": thumbnail_url(self.photo_url, thumbnail_size) if thumbnail_size else None,
         }
 
 
+@sharded_table
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
-    recipient_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    sender_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
     text = db.Column(db.Text, nullable=False)
     read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Shared by the copies of a message stored on the sender's and recipient's shards
+    global_id = db.Column(db.String(36), index=True)
 
     __table_args__ = (
         db.Index("idx_sender_recipient", "sender_id", "recipient_id"),
         db.Index("idx_recipient_created", "recipient_id", "created_at"),
+        # Cover the recent-partner lookups in user search
+        db.Index("idx_sender_created_recipient", "sender_id", "created_at", "recipient_id"),
+        db.Index("idx_recipient_created_sender", "recipient_id", "created_at", "sender_id"),
     )
 
     def to_dict(self):
@@ -148,8 +192,354 @@ class Message(db.Model):
             "timestamp": timestamp.isoformat(),
         }
 
+    def to_dict_compact(self):
+        """Like to_dict() but without the sender and recipient names and emails."""
+        timestamp = self.created_at
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return {
+            "id": self.id,
+            "senderId": self.sender_id,
+            "recipientId": self.recipient_id,
+            "text": self.text,
+            "read": self.read,
+            "timestamp": timestamp.isoformat(),
+        }
+
+
+def to_columnar(rows, keys):
+    """Turn a list of dicts into ``{key: [value, ...]}`` column arrays."""
+    return {key: [row[key] for row in rows] for key in keys}
+
+
+def wants_columnar():
+    return request.args.get("format") == "columnar"
+
+
+class ShardAssignment(db.Model):
+    """Explicit shard placement for a user, overriding ``user_id % shard count``."""
+    user_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def lookup_shard_assignment(user_id):
+    assignment = db.session.get(ShardAssignment, user_id)
+    return assignment.shard if assignment else None
+
+
+def mirror_message_changes(messages_filter, current_user_id, values=None):
+    """Repeat an update (``values``) or a delete (``values=None``) on the copies
+    of the matching messages stored on other users' shards.
+
+    Must run before the local change so the affected rows can still be
+    found; the caller commits. Does nothing unless sharding is enabled.
+    """
+    router = shard_router()
+    if not router.enabled:
+        return
+    own_shard = router.shard_for_user(current_user_id)
+    rows = db.session.query(Message.global_id, Message.sender_id, Message.recipient_id).filter(messages_filter).all()
+
+    global_ids_by_shard = defaultdict(set)
+    for global_id, sender_id, recipient_id in rows:
+        partner_id = recipient_id if sender_id == current_user_id else sender_id
+        partner_shard = router.shard_for_user(partner_id)
+        if global_id and partner_shard != own_shard:
+            global_ids_by_shard[partner_shard].add(global_id)
+
+    table = Message.__table__
+    db.session.flush()  # pending changes belong to the current shard
+    for shard_key, global_ids in global_ids_by_shard.items():
+        with router.using_shard(shard_key):
+            condition = table.c.global_id.in_(global_ids)
+            if values is None:
+                db.session.execute(table.delete().where(condition))
+            else:
+                db.session.execute(table.update().where(condition).values(**values))
+
+
+# Square thumbnail sizes the API hands out; a small fixed set keeps CDN hit rates high
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+
+
+def thumbnail_size_param(value):
+    """Snap a requested thumbnail size to the nearest supported size at or above it."""
+    try:
+        requested = int(value)
+    except (TypeError, ValueError):
+        return None
+    if requested <= 0:
+        return None
+    return next((size for size in THUMBNAIL_SIZES if size >= requested), THUMBNAIL_SIZES[-1])
+
+
+def thumbnail_url(url, size):
+    """Return a URL for a ``size`` x ``size`` thumbnail of the image at ``url``.
+
+    Cloudinary URLs get a transformation that crops around faces and lets
+    Cloudinary pick the format and quality. Other URLs cannot be resized on
+    the fly and are returned unchanged.
+    """
+    if not url:
+        return None
+    marker = "/image/upload/"
+    if "res.cloudinary.com" not in url or marker not in url:
+        return url
+    base, rest = url.split(marker, 1)
+    return f"{base}{marker}c_fill,g_face,w_{size},h_{size},f_auto,q_auto/{rest}"
+
+
+# Background jobs: handlers are registered by name and run by worker.py
+JOB_HANDLERS = {}
+
+# Job kinds that no longer have a handler; queued ones are dropped by init_db()
+RETIRED_JOB_KINDS = ("mark_conversation_read",)
+
+
+def job_handler(kind):
+    """Register ``func(payload)`` as the handler for jobs of ``kind``."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    idempotency_key = db.Column(db.String(255), unique=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("idx_job_status_run_at", "status", "run_at"),
+    )
+
+
+def enqueue_job(kind, payload=None, idempotency_key=None, delay_seconds=0, max_attempts=5, requeue_finished=False):
+    """Queue a background job and commit it.
+
+    A job whose ``idempotency_key`` was already queued is not added again;
+    the existing job is returned instead. With ``requeue_finished`` an
+    existing job that is done or failed is reset to run again.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing and requeue_finished and existing.status in ("done", "failed"):
+            existing.payload = json.dumps(payload or {})
+            existing.status = "pending"
+            existing.attempts = 0
+            existing.max_attempts = max_attempts
+            existing.run_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+            existing.locked_at = existing.last_error = existing.finished_at = None
+            db.session.commit()
+        if existing:
+            return existing
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Another request queued the same key first
+        return Job.query.filter_by(idempotency_key=idempotency_key).first()
+    db.session.commit()
+    return job
+
+
+@job_handler("purge_finished_jobs")
+def purge_finished_jobs_job(payload):
+    cutoff = datetime.utcnow() - timedelta(days=payload.get("days", 7))
+    Job.query.filter(Job.status == "done", Job.finished_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+
+# Rows removed per DELETE when purging an account; each batch is its own
+# short transaction so other writers are never blocked for long
+PURGE_BATCH_SIZE = 1000
+
+
+def iter_user_export(user_id, batch_size=PURGE_BATCH_SIZE):
+    """Yield a JSON document with all of a user's data, a chunk at a time."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise ValueError(f"User {user_id} not found")
+    profile = user.to_dict_basic()
+    profile["createdAt"] = user.created_at.isoformat()
+    yield '{"exportedAt": %s, "user": %s, "contacts": [' % (
+        json.dumps(datetime.now(timezone.utc).isoformat()), json.dumps(profile)
+    )
+
+    with user_shard(user_id):
+        contacts = Contact.query.filter_by(user_id=user_id).order_by(Contact.id).yield_per(batch_size)
+        for index, contact in enumerate(contacts):
+            yield ("," if index else "") + json.dumps(contact.to_dict())
+
+        yield '], "messages": ['
+        messages = Message.query.filter(
+            or_(Message.sender_id == user_id, Message.recipient_id == user_id)
+        ).order_by(Message.id).yield_per(batch_size)
+        for index, message in enumerate(messages):
+            yield ("," if index else "") + json.dumps(message.to_dict_compact())
+    yield "]}"
+
+
+def delete_in_batches(model, condition, batch_size=PURGE_BATCH_SIZE):
+    """Delete rows matching ``condition`` with bounded set-based DELETEs."""
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(model.id).filter(condition).limit(batch_size).all()]
+        if not ids:
+            return deleted
+        deleted += model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def purge_user_data(user_id, batch_size=PURGE_BATCH_SIZE):
+    """Delete a user together with their contacts and messages.
+
+    Returns the number of rows deleted per table.
+    """
+    with user_shard(user_id):
+        counts = {"contacts": delete_in_batches(Contact, Contact.user_id == user_id, batch_size), "messages": 0}
+
+    # Copies of the user's messages can be on any partner's shard
+    router = shard_router()
+    for shard_key in router.bind_keys or [None]:
+        with router.using_shard(shard_key):
+            counts["messages"] += delete_in_batches(
+                Message, or_(Message.sender_id == user_id, Message.recipient_id == user_id), batch_size
+            )
+
+    counts["users"] = User.query.filter_by(id=user_id).delete(synchronize_session=False)
+    db.session.commit()
+    return counts
+
+
+@job_handler("purge_user")
+def purge_user_job(payload):
+    counts = purge_user_data(payload["user_id"])
+    print(f"Purged user {payload['user_id']}: {counts}")
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 timestamp from a request into a naive UTC datetime."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def prefix_match(column, prefix):
+    """Filter ``column`` to values starting with ``prefix``.
+
+    The range bounds let the database answer from a b-tree index instead of
+    scanning every row; the LIKE keeps the result exact.
+    """
+    return and_(column >= prefix, column < prefix + "\uffff", column.startswith(prefix, autoescape=True))
+
+
+# Messages scanned in each direction when ranking recent partners in user search
+SEARCH_PARTNER_MESSAGES = 200
+
+
+def recent_partner_ids(user_id):
+    """Ids of the people in the user's latest messages, sent and received.
+
+    Reads at most ``SEARCH_PARTNER_MESSAGES`` index entries each way, so the cost does
+    not grow with the user's history. The two selects stay separate because
+    messages may live on a shard and a UNION carries no mapper to route by.
+    """
+    partner_ids = set(db.session.scalars(
+        db.select(Message.recipient_id).where(Message.sender_id == user_id)
+        .order_by(Message.created_at.desc()).limit(SEARCH_PARTNER_MESSAGES)
+    ))
+    partner_ids.update(db.session.scalars(
+        db.select(Message.sender_id).where(Message.recipient_id == user_id)
+        .order_by(Message.created_at.desc()).limit(SEARCH_PARTNER_MESSAGES)
+    ))
+    partner_ids.discard(user_id)
+    return partner_ids
+
+
+def json_object_body():
+    """The request's JSON body as a dict ({} when there is no body), or None if it is not an object."""
+    data = request.get_json(silent=True)
+    if data is None and not request.get_data():
+        return {}
+    return data if isinstance(data, dict) else None
+
+
+def message_batch_filters(current_user_id, data):
+    """Build the filters for a bulk message operation from its JSON body.
 
-def create_app():
+    Supports an explicit ``ids`` list, a conversation partner
+    (``recipientEmail``) and an optional ``before``/``after`` time range.
+    Raises ValueError for malformed input.
+    """
+    filters = []
+
+    ids = data.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValueError("ids must be a list")
+        try:
+            ids = {int(i) for i in ids}
+        except (TypeError, ValueError):
+            raise ValueError("ids must be integers")
+        if len(ids) > 1000:
+            raise ValueError("At most 1000 ids can be processed per request")
+        filters.append(Message.id.in_(ids))
+
+    recipient_email = (data.get("recipientEmail") or "").strip().lower()
+    if recipient_email:
+        other_user = User.query.filter_by(email=recipient_email).first()
+        other_user_id = other_user.id if other_user else None
+        filters.append(
+            or_(
+                and_(Message.sender_id == current_user_id, Message.recipient_id == other_user_id),
+                and_(Message.sender_id == other_user_id, Message.recipient_id == current_user_id),
+            )
+        )
+
+    try:
+        before = parse_timestamp(data.get("before"))
+        after = parse_timestamp(data.get("after"))
+    except ValueError:
+        raise ValueError("before and after must be ISO-8601 timestamps")
+    if before:
+        filters.append(Message.created_at < before)
+    if after:
+        filters.append(Message.created_at >= after)
+
+    return filters
+
+
+def create_app(replica_urls=None, shard_urls=None):
+    """Create the Flask app.
+
+    ``replica_urls`` is an optional list of read-replica database URLs; when
+    omitted it is read from DATABASE_REPLICA_URLS (comma separated).
+    ``shard_urls`` likewise lists the databases contacts and messages are
+    sharded across (SHARD_DATABASE_URLS).
+    """
     app = Flask(__name__)
 
     # Config
@@ -159,6 +549,12 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///app.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+    # Reverse proxies in front of the app (Render has one). Only that many
+    # X-Forwarded-For hops are trusted when working out the client address.
+    app.config["TRUSTED_PROXY_HOPS"] = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    if app.config["TRUSTED_PROXY_HOPS"]:
+        hops = app.config["TRUSTED_PROXY_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     # Extensions - CORS Configuration
     # Get allowed origins from environment or use default
@@ -173,7 +569,7 @@ def create_app():
                  "origins": allowed_origins,
                  "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
                  "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
-                 "expose_headers": ["Content-Type", "Authorization"],
+                 "expose_headers": ["Content-Type", "Authorization", "Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining"],
                  "supports_credentials": True,
                  "max_age": 3600
              }
@@ -181,7 +577,25 @@ def create_app():
          supports_credentials=True,
          automatic_options=True)
     
-    JWTManager(app)
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blocklist_loader
+    def account_closed(jwt_header, jwt_payload):
+        # Tokens of deleted accounts, or ones scheduled for deletion, stop working,
+        # as do tokens older than the account (a deleted user's id taken over).
+        # Every verify call in a request runs this, so look the account up once
+        closed = g.get("account_closed")
+        if closed is None:
+            row = db.session.execute(
+                db.select(User.deleted_at, User.created_at).where(User.id == int(jwt_payload["sub"]))
+            ).first()
+            closed = (
+                row is None
+                or row.deleted_at is not None
+                or jwt_payload.get("iat", 0) < int(row.created_at.replace(tzinfo=timezone.utc).timestamp())
+            )
+            g.account_closed = closed
+        return closed
     
     # Ensure OPTIONS requests don't require JWT and have proper CORS headers
     @app.before_request
@@ -202,6 +616,25 @@ def create_app():
                 response.headers.add("Access-Control-Allow-Credentials", "true")
                 response.headers.add("Access-Control-Max-Age", "3600")
             return response
+
+    # gzip/brotli responses (see compression.py)
+    Compress(app)
+
+    # Cache-Control and ETags on GET responses (see http_cache.py)
+    HttpCache(app)
+
+    # Per-user and per-route request budgets (see rate_limit.py); runs
+    # first so over-budget clients never take a concurrency slot
+    RateLimiter(app)
+
+    # Request deadlines and concurrency limit (see load_control.py)
+    LoadControl(app)
+
+    # Send GET reads to replicas when configured (see db_routing.py)
+    ReplicaRouter(app, replica_urls)
+
+    # Keep each user's contacts and messages on their shard (see sharding.py)
+    ShardRouter(app, shard_urls, lookup_shard_assignment)
     
     db.init_app(app)
 
@@ -240,6 +673,8 @@ def create_app():
             db.session.add(user)
             db.session.commit()
             token = create_access_token(identity=str(user.id))
+            # The request carried no token, so tell the replica router who just wrote
+            g.db_pin_user = str(user.id)
             return jsonify({"user": user.to_dict_basic(), "token": token})
         except Exception as e:
             db.session.rollback()
@@ -254,6 +689,8 @@ def create_app():
             user = User.query.filter_by(email=email).first()
             if not user or not bcrypt.verify(password, user.password_hash):
                 return jsonify({"message": "Incorrect email or password"}), 401
+            if user.deleted_at is not None:
+                return jsonify({"message": "This account is being deleted"}), 403
             token = create_access_token(identity=str(user.id))
             return jsonify({"user": user.to_dict_basic(), "token": token})
         except Exception as e:
@@ -271,6 +708,42 @@ def create_app():
         except Exception as e:
             return jsonify({"message": f"Error: {str(e)}"}), 500
 
+    # Account data
+    @app.get("/api/account/export")
+    @jwt_required()
+    def export_account():
+        current_user_id = int(get_jwt_identity())
+        if not db.session.get(User, current_user_id):
+            return jsonify({"message": "User not found"}), 404
+        response = Response(stream_with_context(iter_user_export(current_user_id)), mimetype="application/json")
+        response.headers["Content-Disposition"] = f"attachment; filename=contact-manager-export-{current_user_id}.json"
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    @app.delete("/api/account")
+    @jwt_required()
+    def delete_account():
+        try:
+            current_user_id = int(get_jwt_identity())
+            user = db.session.get(User, current_user_id)
+            if not user:
+                return jsonify({"message": "User not found"}), 404
+            data = request.get_json(silent=True) or {}
+            password = (data.get("password") or "").strip()
+            if not password or not bcrypt.verify(password, user.password_hash):
+                return jsonify({"message": "Password confirmation is incorrect"}), 403
+            # Lock the account now; the purge itself runs in the background
+            if user.deleted_at is None:
+                user.deleted_at = datetime.utcnow()
+            enqueue_job(
+                "purge_user", {"user_id": current_user_id},
+                idempotency_key=f"purge-user:{current_user_id}", requeue_finished=True,
+            )
+            return jsonify({"success": True, "status": "scheduled"}), 202
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": f"Error deleting account: {str(e)}"}), 500
+
     # Image Upload
     @app.post("/api/upload")
     @jwt_required()
@@ -302,11 +775,29 @@ def create_app():
     @jwt_required()
     def search_users():
         try:
-            email = request.args.get("email", "").strip().lower()
-            if not email:
+            current_user_id = int(get_jwt_identity())
+            term = request.args.get("email", "").strip().lower()
+            if not term:
                 return jsonify({"users": []})
-            
-            users = User.query.filter(User.email.ilike(f"%{email}%")).limit(10).all()
+            limit = 10
+
+            matches = or_(prefix_match(User.email, term), prefix_match(db.func.lower(User.name), term))
+
+            # People the user has talked to recently are ranked first. Their ids are
+            # fetched separately because messages may live on a different database
+            partner_ids = recent_partner_ids(current_user_id)
+            check_deadline()
+            users = []
+            if partner_ids:
+                users = User.query.filter(matches, User.id.in_(partner_ids)).order_by(User.email).limit(limit).all()
+
+            if len(users) < limit:
+                check_deadline()
+                seen_ids = [u.id for u in users]
+                users += User.query.filter(matches, User.id.notin_(seen_ids)).order_by(User.email).limit(
+                    limit - len(users)
+                ).all()
+
             return jsonify({"users": [u.to_dict_basic() for u in users]})
         except Exception as e:
             return jsonify({"message": f"Search failed: {str(e)}"}), 500
@@ -335,6 +826,8 @@ def create_app():
         if group and group != "all":
             query = query.filter_by(group=group)
 
+        thumbnail_size = thumbnail_size_param(request.args.get("thumb"))
+
         if sort == "favorites":
             query = query.order_by(Contact.is_favorite.desc(), Contact.name.asc())
         elif sort == "frequent":
@@ -342,12 +835,61 @@ def create_app():
         else:
             query = query.order_by(Contact.name.asc())
 
-        try:
-            contacts = [c.to_dict() for c in query.all()]
+        def build():
+            contacts = [c.to_dict(thumbnail_size) for c in query.all()]
+            if wants_columnar():
+                keys = [
+                    "id", "name", "email", "phone", "company", "notes", "photo", "group",
+                    "isFavorite", "accessCount", "lastAccessed", "createdAt", "photoThumbnail",
+                ]
+                return jsonify({"format": "columnar", "count": len(contacts), "contacts": to_columnar(contacts, keys)})
             return jsonify({"contacts": contacts})
+
+        try:
+            # Row version of all the user's contacts, so revalidation skips loading them
+            count, max_id, last_modified = db.session.query(
+                db.func.count(Contact.id),
+                db.func.max(Contact.id),
+                db.func.max(db.func.coalesce(Contact.updated_at, Contact.created_at)),
+            ).filter(Contact.user_id == current_user_id).one()
+            check_deadline()
+            return conditional_response((count, max_id, str(last_modified)), build)
         except Exception as e:
             return jsonify({"message": f"Error loading contacts: {str(e)}"}), 500
 
+    @app.get("/api/contacts/groups")
+    @jwt_required()
+    def list_contact_groups():
+        try:
+            current_user_id = int(get_jwt_identity())
+            rows = db.session.query(
+                Contact.group,
+                db.func.count(Contact.id),
+                db.func.sum(db.case((Contact.is_favorite.is_(True), 1), else_=0)),
+            ).filter(Contact.user_id == current_user_id).group_by(Contact.group).all()
+
+            groups = []
+            total = 0
+            favorites = 0
+            ungrouped = 0
+            for group, count, favorite_count in rows:
+                total += count
+                favorites += favorite_count or 0
+                if group:
+                    groups.append({"name": group, "count": count})
+                else:
+                    ungrouped += count
+            groups.sort(key=lambda g: g["name"].lower())
+
+            return jsonify({
+                "groups": groups,
+                "total": total,
+                "favorites": favorites,
+                "ungrouped": ungrouped,
+            })
+        except Exception as e:
+            return jsonify({"message": f"Error loading groups: {str(e)}"}), 500
+
     @app.post("/api/contacts")
     @jwt_required()
     def create_contact():
@@ -515,8 +1057,24 @@ def create_app():
                 recipient_id=recipient.id,
                 text=text,
                 read=False,
+                global_id=str(uuid.uuid4()),
+                created_at=datetime.utcnow(),
             )
             db.session.add(message)
+
+            # Users on different shards each keep their own copy of the message
+            router = shard_router()
+            if router.enabled and router.shard_for_user(recipient.id) != router.shard_for_user(current_user_id):
+                db.session.flush()  # write the sender's copy before switching shards
+                with user_shard(recipient.id):
+                    db.session.execute(Message.__table__.insert().values(
+                        sender_id=message.sender_id,
+                        recipient_id=message.recipient_id,
+                        text=message.text,
+                        read=False,
+                        global_id=message.global_id,
+                        created_at=message.created_at,
+                    ))
             db.session.commit()
             
             # Load relationships before returning
@@ -544,22 +1102,43 @@ def create_app():
                 return jsonify({"messages": []})
 
             # Get messages between current user and recipient
-            messages = Message.query.options(
-                db.joinedload(Message.sender),
-                db.joinedload(Message.recipient)
-            ).filter(
-                or_(
-                    and_(Message.sender_id == current_user_id, Message.recipient_id == recipient.id),
-                    and_(Message.sender_id == recipient.id, Message.recipient_id == current_user_id),
-                )
-            ).order_by(Message.created_at.asc()).all()
-
-            # Mark messages as read
-            Message.query.filter_by(sender_id=recipient.id, recipient_id=current_user_id, read=False).update({"read": True})
-            db.session.commit()
-
-            return jsonify({"messages": [m.to_dict() for m in messages]})
+            conversation_filter = or_(
+                and_(Message.sender_id == current_user_id, Message.recipient_id == recipient.id),
+                and_(Message.sender_id == recipient.id, Message.recipient_id == current_user_id),
+            )
+            query = Message.query.filter(conversation_filter).order_by(Message.created_at.asc())
+
+            def build():
+                # Read-only: the client marks the conversation read with
+                # POST /api/messages/conversation/read once it has shown it
+                if wants_columnar():
+                    # Only two people are in a conversation, so send their details once
+                    messages = query.all()
+                    users = {u.id: u.to_dict_basic() for u in (User.query.get(current_user_id), recipient) if u}
+                    serialized = {
+                        "format": "columnar",
+                        "count": len(messages),
+                        "users": users,
+                        "messages": to_columnar(
+                            [m.to_dict_compact() for m in messages],
+                            ["id", "senderId", "recipientId", "text", "read", "timestamp"],
+                        ),
+                    }
+                else:
+                    messages = query.options(db.selectinload(Message.sender), db.selectinload(Message.recipient)).all()
+                    serialized = {"messages": [m.to_dict() for m in messages]}
+                return jsonify(serialized)
+
+            # Row version of the conversation, so polling revalidation skips loading it
+            count, max_id, read_count = db.session.query(
+                db.func.count(Message.id),
+                db.func.max(Message.id),
+                db.func.sum(db.case((Message.read.is_(True), 1), else_=0)),
+            ).filter(conversation_filter).one()
+            check_deadline()
+            return conditional_response((count, max_id, read_count), build)
         except Exception as e:
+            db.session.rollback()
             return jsonify({"message": f"Error getting conversation: {str(e)}"}), 500
 
     @app.get("/api/messages/conversations")
@@ -595,14 +1174,15 @@ def create_app():
 
             # Get last message and unread count for each conversation
             for user_id, last_time in conversation_map.items():
+                check_deadline()
                 other_user = User.query.get(user_id)
                 if not other_user:
                     continue
 
                 # Get last message for each conversation
                 last_message = Message.query.options(
-                    db.joinedload(Message.sender),
-                    db.joinedload(Message.recipient)
+                    db.selectinload(Message.sender),
+                    db.selectinload(Message.recipient)
                 ).filter(
                     or_(
                         and_(Message.sender_id == current_user_id, Message.recipient_id == user_id),
@@ -650,6 +1230,7 @@ def create_app():
             message = Message.query.filter_by(id=message_id, recipient_id=current_user_id).first()
             if not message:
                 return jsonify({"message": "Message not found"}), 404
+            mirror_message_changes(Message.id == message.id, current_user_id, {"read": True})
             message.read = True
             db.session.commit()
             return jsonify({"success": True})
@@ -670,6 +1251,7 @@ def create_app():
             ).first()
             if not message:
                 return jsonify({"message": "Message not found"}), 404
+            mirror_message_changes(Message.id == message.id, current_user_id)
             db.session.delete(message)
             db.session.commit()
             return jsonify({"success": True})
@@ -677,6 +1259,71 @@ def create_app():
             db.session.rollback()
             return jsonify({"message": f"Error deleting message: {str(e)}"}), 500
 
+    # Bulk message operations
+    @app.post("/api/messages/bulk/read")
+    @jwt_required()
+    def bulk_mark_messages_read():
+        try:
+            current_user_id = int(get_jwt_identity())
+            data = json_object_body()
+            if data is None:
+                return jsonify({"message": "Request body must be a JSON object"}), 400
+            try:
+                filters = message_batch_filters(current_user_id, data)
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
+
+            # Only messages received by the current user can be marked as read
+            condition = and_(Message.recipient_id == current_user_id, Message.read.is_(False), *filters)
+            mirror_message_changes(condition, current_user_id, {"read": True})
+            updated = Message.query.filter(condition).update({"read": True}, synchronize_session=False)
+            db.session.commit()
+
+            unread_count = Message.query.filter_by(recipient_id=current_user_id, read=False).count()
+            return jsonify({"updated": updated, "unreadCount": unread_count})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": f"Error marking messages as read: {str(e)}"}), 500
+
+    @app.post("/api/messages/conversation/read")
+    @jwt_required()
+    def mark_conversation_read():
+        data = json_object_body()
+        if data is None:
+            return jsonify({"message": "Request body must be a JSON object"}), 400
+        if not (data.get("recipientEmail") or "").strip():
+            return jsonify({"message": "recipientEmail is required"}), 400
+        return bulk_mark_messages_read()
+
+    @app.post("/api/messages/bulk/delete")
+    @jwt_required()
+    def bulk_delete_messages():
+        try:
+            current_user_id = int(get_jwt_identity())
+            data = json_object_body()
+            if data is None:
+                return jsonify({"message": "Request body must be a JSON object"}), 400
+            if not data.get("ids") and not (data.get("recipientEmail") or "").strip():
+                return jsonify({"message": "ids or recipientEmail is required"}), 400
+            try:
+                filters = message_batch_filters(current_user_id, data)
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
+
+            condition = and_(
+                or_(Message.sender_id == current_user_id, Message.recipient_id == current_user_id),
+                *filters,
+            )
+            mirror_message_changes(condition, current_user_id)
+            deleted = Message.query.filter(condition).delete(synchronize_session=False)
+            db.session.commit()
+
+            unread_count = Message.query.filter_by(recipient_id=current_user_id, read=False).count()
+            return jsonify({"deleted": deleted, "unreadCount": unread_count})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": f"Error deleting messages: {str(e)}"}), 500
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -698,9 +1345,104 @@ def create_app():
     return app
 
 
+def add_missing_columns():
+    """Add nullable model columns that are missing from existing tables.
+
+    create_all() never alters a table that already exists, so columns added
+    to a model later (such as Contact.updated_at) are added here.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                ))
+                print(f"Added column {table.name}.{column.name}")
+
+
+def ensure_foreign_key_rules():
+    """Bring ON DELETE rules of existing PostgreSQL foreign keys in line with the models.
+
+    SQLite cannot alter constraints, so only PostgreSQL is updated. Each
+    constraint is swapped for a NOT VALID one in a short transaction, and
+    validated in a transaction of its own afterwards. VALIDATE only takes a
+    SHARE UPDATE EXCLUSIVE lock, so reads and writes carry on during the scan.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return
+    inspector = db.inspect(db.engine)
+    to_validate = []
+    for table in db.metadata.sorted_tables:
+        existing = inspector.get_foreign_keys(table.name)
+        for constraint in table.foreign_key_constraints:
+            if not constraint.ondelete:
+                continue
+            columns = [column.name for column in constraint.columns]
+            for foreign_key in existing:
+                current = (foreign_key.get("options") or {}).get("ondelete") or ""
+                if foreign_key["constrained_columns"] != columns or current.upper() == constraint.ondelete.upper():
+                    continue
+                name = foreign_key["name"]
+                constrained = ", ".join(f'"{c}"' for c in columns)
+                referred = ", ".join(f'"{c}"' for c in foreign_key["referred_columns"])
+                with db.engine.begin() as connection:
+                    connection.execute(db.text(f'ALTER TABLE "{table.name}" DROP CONSTRAINT "{name}"'))
+                    connection.execute(db.text(
+                        f'ALTER TABLE "{table.name}" ADD CONSTRAINT "{name}" FOREIGN KEY ({constrained}) '
+                        f'REFERENCES "{foreign_key["referred_table"]}" ({referred}) '
+                        f'ON DELETE {constraint.ondelete} NOT VALID'
+                    ))
+                to_validate.append((table.name, name))
+                print(f"Updated foreign key {table.name}.{name} to ON DELETE {constraint.ondelete}")
+
+    for table_name, name in to_validate:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f'ALTER TABLE "{table_name}" VALIDATE CONSTRAINT "{name}"'))
+
+
+def drop_retired_jobs():
+    """Delete unfinished jobs of kinds that no longer have a handler.
+
+    They would otherwise be retried until they fail for want of a handler.
+    """
+    dropped = Job.query.filter(
+        Job.kind.in_(RETIRED_JOB_KINDS), Job.status.in_(("pending", "running"))
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if dropped:
+        print(f"Dropped {dropped} queued jobs of retired kinds")
+
+
 def init_db(app: Flask):
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
+        add_missing_columns()
+        ensure_foreign_key_rules()
+        drop_retired_jobs()
+        router = app.extensions["shard_router"]
+        router.create_shard_tables(db)
+        if router.enabled:
+            with db.engine.connect() as connection:
+                unmigrated = any(
+                    connection.execute(db.select(table.c.id).limit(1)).first() is not None
+                    for table in (Contact.__table__, Message.__table__)
+                )
+            if unmigrated:
+                print(
+                    "⚠️ The main database still holds contacts or messages, which are not read while "
+                    "sharding is on. Run: python rebalance_shards.py --migrate-main"
+                )
+        # create_all() skips tables that already exist, so add any indexes
+        # introduced after the table was first created
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
         print("Database initialized successfully!")
 
 
@@ -0,0 +1,94 @@
+"""
+Response compression for the Contact Manager API.
+
+JSON responses above a small size threshold are compressed with brotli when
+the client accepts it and the optional ``brotli`` package is installed, and
+with gzip otherwise.
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def accepted_encodings(header):
+    """Return the encodings in an Accept-Encoding header that have a non-zero q value."""
+    encodings = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            encodings.add(name)
+    return encodings
+
+
+class Compress:
+    """Compresses eligible responses according to the request's Accept-Encoding."""
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_ENABLED", os.getenv("COMPRESS_ENABLED", "true").lower() != "false")
+        app.config.setdefault("COMPRESS_MIN_SIZE", int(os.getenv("COMPRESS_MIN_SIZE", "500")))
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        app.extensions["compress"] = self
+        if app.config["COMPRESS_ENABLED"]:
+            app.after_request(self._after_request)
+
+    def choose_encoding(self):
+        encodings = accepted_encodings(request.headers.get("Accept-Encoding"))
+        if brotli is not None and "br" in encodings:
+            return "br"
+        if "gzip" in encodings:
+            return "gzip"
+        return None
+
+    def _after_request(self, response):
+        response.vary.add("Accept-Encoding")
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        encoding = self.choose_encoding()
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        elif encoding == "gzip":
+            compressed = gzip.compress(data, compresslevel=self.gzip_level)
+        else:
+            return response
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(len(compressed))
+        return response
@@ -0,0 +1,49 @@
+"""
+Shared fixtures for the backend tests.
+
+Each test gets its own SQLite database under ``tmp_path`` with rate
+limiting off; tests that need other settings set them with ``monkeypatch``
+before calling ``make_app``.
+"""
+import pytest
+
+from app import create_app, init_db
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Return a function that builds an initialised app; keyword arguments go to create_app()."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'main.db'}")
+    monkeypatch.setenv("RATELIMIT_ENABLED", "false")
+
+    def make(**kwargs):
+        app = create_app(**kwargs)
+        app.config["TESTING"] = True
+        init_db(app)
+        return app
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register():
+    """Return a function that registers ``name`` and returns its auth headers."""
+
+    def register(client, name):
+        response = client.post(
+            "/api/auth/register", json={"name": name, "email": f"{name}@example.com", "password": "pw"}
+        )
+        assert response.status_code == 200, response.get_json()
+        return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+    return register
@@ -0,0 +1,142 @@
+"""
+Read-replica routing for the Contact Manager API.
+
+When replica URLs are configured, SELECTs issued while handling a GET
+request are sent to one of the replicas and everything else goes to the
+primary. After a user makes a write, their reads stay on the primary for a
+short window so they always see their own changes.
+
+Locally this can be tried with two SQLite files, e.g.
+DATABASE_URL=sqlite:///app.db DATABASE_REPLICA_URLS=sqlite:///replica.db
+(copy app.db to replica.db to "replicate").
+"""
+import itertools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+
+from sharding import shard_bind_for
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    """Session that sends per-user tables to the user's shard and other reads
+    to the replica picked for the current request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            shard_key = shard_bind_for(mapper, clause)
+            if shard_key is not None:
+                return self._db.engines[shard_key]
+        if bind is None and has_request_context():
+            replica_key = g.get("db_replica")
+            if replica_key is not None:
+                if clause is not None and clause.is_select and not self._flushing:
+                    return self._db.engines[replica_key]
+                # The request wrote something: serve the rest of it from the primary
+                g.db_replica = None
+                g.db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Registers replica binds on the app and picks a replica per request.
+
+    Primary pins are kept in this process, which matches the single-worker
+    gunicorn setup in the Procfile.
+    """
+
+    def __init__(self, app=None, replica_urls=None):
+        self.bind_keys = []
+        self.strategy = "round_robin"
+        self.pin_seconds = 5.0
+        self._cycle = None
+        self._pins = {}
+        self._pins_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, replica_urls)
+
+    def init_app(self, app, replica_urls=None):
+        if replica_urls is None:
+            replica_urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+        app.config.setdefault("SQLALCHEMY_REPLICA_URLS", list(replica_urls))
+        app.config.setdefault("DATABASE_REPLICA_STRATEGY", os.getenv("DATABASE_REPLICA_STRATEGY", "round_robin"))
+        app.config.setdefault("DATABASE_PRIMARY_PIN_SECONDS", float(os.getenv("DATABASE_PRIMARY_PIN_SECONDS", "5")))
+
+        if app.config["DATABASE_REPLICA_STRATEGY"] not in ("round_robin", "least_connections"):
+            raise ValueError("DATABASE_REPLICA_STRATEGY must be 'round_robin' or 'least_connections'")
+        self.strategy = app.config["DATABASE_REPLICA_STRATEGY"]
+        self.pin_seconds = app.config["DATABASE_PRIMARY_PIN_SECONDS"]
+
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        self.bind_keys = []
+        for index, url in enumerate(app.config["SQLALCHEMY_REPLICA_URLS"]):
+            key = f"replica_{index}"
+            binds[key] = url
+            self.bind_keys.append(key)
+        self._cycle = itertools.cycle(self.bind_keys)
+
+        app.extensions["replica_router"] = self
+        if self.bind_keys:
+            print(f"Read replicas configured: {len(self.bind_keys)} ({self.strategy})")
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def _current_user_id(self):
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except Exception:
+            return None
+
+    def is_pinned(self, user_id):
+        with self._pins_lock:
+            expires = self._pins.get(user_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._pins[user_id]
+                return False
+            return True
+
+    def pin(self, user_id):
+        now = time.monotonic()
+        with self._pins_lock:
+            self._pins[user_id] = now + self.pin_seconds
+            if len(self._pins) > 10_000:
+                self._pins = {key: expires for key, expires in self._pins.items() if expires >= now}
+
+    def choose_replica(self):
+        if self.strategy == "least_connections":
+            engines = current_app.extensions["sqlalchemy"].engines
+
+            def checked_out(key):
+                checkedout = getattr(engines[key].pool, "checkedout", None)
+                return checkedout() if checkedout else 0
+
+            return min(self.bind_keys, key=checked_out)
+        return next(self._cycle)
+
+    def _before_request(self):
+        g.db_replica = None
+        g.db_wrote = False
+        if request.method not in READ_METHODS:
+            return None
+        user_id = self._current_user_id()
+        if user_id is not None and self.is_pinned(user_id):
+            return None
+        g.db_replica = self.choose_replica()
+        return None
+
+    def _after_request(self, response):
+        if response.status_code < 400 and (request.method not in READ_METHODS or g.get("db_wrote")):
+            # Handlers that create an identity (registration) name it in g.db_pin_user
+            user_id = g.get("db_pin_user") or self._current_user_id()
+            if user_id is not None:
+                self.pin(user_id)
+        return response
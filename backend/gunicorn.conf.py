@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the Contact Manager API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Sync workers handle one request at a time, so the concurrency limiter in
+load_control.py would never see a second request. Threaded workers get one
+thread per running slot (MAX_CONCURRENT_REQUESTS) plus one per queue slot
+(MAX_QUEUED_REQUESTS); anything beyond that waits in gunicorn's backlog.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = max(1, int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))) + int(os.getenv("MAX_QUEUED_REQUESTS", "8"))
@@ -0,0 +1,77 @@
+"""
+HTTP caching headers for the Contact Manager API.
+
+GET responses are marked ``private, no-cache`` so browsers keep them but
+revalidate before reuse, and carry a weak ETag. Endpoints that can compute a
+cheap row version (see ``conditional_response``) answer revalidations with
+``304 Not Modified`` before loading any rows; everything else gets an ETag
+derived from the response body.
+
+Only ``If-None-Match`` is honoured. A row version is not a timestamp: deleting
+a row or flipping a flag changes it without moving any ``max(updated_at)``,
+so ``If-Modified-Since`` would hand out stale 304s.
+"""
+import hashlib
+
+from flask import g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def not_modified(etag):
+    """Whether the request's If-None-Match matches the current version."""
+    return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+
+def conditional_response(version, build):
+    """Return 304 when the client already has ``version``, else ``build()``.
+
+    ``version`` should be a cheap summary of the rows behind the response
+    (counts, max ids, max timestamps); it is combined with the full request
+    path and the caller's identity to form the ETag.
+    """
+    etag = make_etag(request.full_path, get_jwt_identity(), version)
+    if not_modified(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag, weak=True)
+    g.http_cache_etag = True
+    return response
+
+
+class HttpCache:
+    """Adds Cache-Control and body ETags to GET responses."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["http_cache"] = self
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if request.method not in ("GET", "HEAD"):
+            return response
+        response.headers.setdefault("Cache-Control", CACHE_CONTROL)
+        response.vary.add("Authorization")
+        if (
+            response.status_code != 200
+            or g.get("http_cache_etag")
+            or response.direct_passthrough
+            or response.is_streamed
+            or "ETag" in response.headers
+        ):
+            return response
+        etag = make_etag(response.get_data())
+        response.set_etag(etag, weak=True)
+        if request.if_none_match and request.if_none_match.contains_weak(etag):
+            response.status_code = 304
+            response.set_data(b"")
+        return response
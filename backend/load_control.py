@@ -0,0 +1,180 @@
+"""
+Request deadlines and concurrency limiting for the Contact Manager API.
+
+Every request gets a deadline from its route's configured budget, shortened
+by an ``X-Request-Timeout`` header (milliseconds) when the client will give
+up sooner. The remaining time is applied to each database transaction
+(``statement_timeout`` on PostgreSQL, a progress handler on SQLite), and
+handlers that run several queries call ``check_deadline()`` between them.
+Requests that run out of time get ``504``.
+
+A concurrency limiter caps the requests a process works on at once. Extra
+requests wait in a short queue; once the queue is full they get ``503``
+straight away, so latency stays bounded under overload. Expensive routes are
+not queued at all: they get ``503`` as soon as every slot is taken.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Seconds each route may run before it is cut off
+DEFAULT_ROUTE_DEADLINES = {
+    "list_contacts": 5.0,
+    "search_users": 2.0,
+    "get_conversation": 3.0,
+    "get_conversations": 5.0,
+    "get_unread_count": 2.0,
+    "export_account": 300.0,
+}
+
+# Expensive routes that are turned away instead of queued when the process is full
+DEFAULT_SHED_ENDPOINTS = ("get_conversations", "search_users")
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining_time():
+    """Seconds left before the current request's deadline, or None without one."""
+    if not has_request_context():
+        return None
+    deadline = g.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current request has run out of time."""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        g.deadline_exceeded = True
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def _sqlite_progress_handler():
+    # Non-zero aborts the running statement with "interrupted"
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        g.deadline_exceeded = True
+        return 1
+    return 0
+
+
+@event.listens_for(Engine, "begin")
+def _apply_deadline_to_transaction(connection):
+    remaining = remaining_time()
+    if remaining is None:
+        return
+    if remaining <= 0:
+        g.deadline_exceeded = True
+        raise DeadlineExceeded("Request deadline exceeded")
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+    elif dialect == "sqlite":
+        dbapi_connection = connection.connection.dbapi_connection
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            dbapi_connection.set_progress_handler(_sqlite_progress_handler, 10_000)
+
+
+class LoadControl:
+    """Per-request deadlines plus a bounded-queue concurrency limit."""
+
+    def __init__(self, app=None):
+        self.route_deadlines = {}
+        self.default_deadline = 10.0
+        self.max_concurrent = 0
+        self.max_queued = 0
+        self.queue_timeout = 0.0
+        self.shed_endpoints = set()
+        self._active = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("REQUEST_DEADLINES", dict(DEFAULT_ROUTE_DEADLINES))
+        app.config.setdefault("REQUEST_DEFAULT_DEADLINE", float(os.getenv("REQUEST_DEFAULT_DEADLINE", "10")))
+        app.config.setdefault("MAX_CONCURRENT_REQUESTS", int(os.getenv("MAX_CONCURRENT_REQUESTS", "8")))
+        app.config.setdefault("MAX_QUEUED_REQUESTS", int(os.getenv("MAX_QUEUED_REQUESTS", "8")))
+        app.config.setdefault("REQUEST_QUEUE_TIMEOUT", float(os.getenv("REQUEST_QUEUE_TIMEOUT", "2")))
+        app.config.setdefault("LOAD_SHED_ENDPOINTS", list(DEFAULT_SHED_ENDPOINTS))
+
+        self.route_deadlines = app.config["REQUEST_DEADLINES"]
+        self.default_deadline = app.config["REQUEST_DEFAULT_DEADLINE"]
+        self.max_concurrent = app.config["MAX_CONCURRENT_REQUESTS"]
+        self.max_queued = app.config["MAX_QUEUED_REQUESTS"]
+        self.queue_timeout = app.config["REQUEST_QUEUE_TIMEOUT"]
+        self.shed_endpoints = set(app.config["LOAD_SHED_ENDPOINTS"])
+
+        app.extensions["load_control"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.register_error_handler(DeadlineExceeded, self._deadline_exceeded)
+
+    def deadline_for(self, endpoint):
+        budget = self.route_deadlines.get(endpoint, self.default_deadline)
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                budget = min(budget, max(0.0, float(header) / 1000))
+            except ValueError:
+                pass
+        return budget
+
+    def _before_request(self):
+        if request.method == "OPTIONS" or request.endpoint is None:
+            return None
+        g.deadline = time.monotonic() + self.deadline_for(request.endpoint)
+
+        if not self.max_concurrent:
+            return None
+        with self._condition:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queued or request.endpoint in self.shed_endpoints:
+                    return self._overloaded()
+                self._waiting += 1
+                try:
+                    timeout = min(self.queue_timeout, max(0.0, remaining_time()))
+                    acquired = self._condition.wait_for(lambda: self._active < self.max_concurrent, timeout)
+                finally:
+                    self._waiting -= 1
+                if not acquired:
+                    return self._overloaded()
+            self._active += 1
+            g.load_slot = True
+        return None
+
+    def _overloaded(self):
+        response = jsonify({"message": "Server is busy, please retry shortly"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+
+    def _deadline_exceeded(self, error):
+        return jsonify({"message": "Request deadline exceeded"}), 504
+
+    def _after_request(self, response):
+        # Handlers report failures as 500s; turn the ones caused by running out of time into 504s
+        if response.status_code == 500 and (g.get("deadline_exceeded") or (remaining_time() or 0) < 0):
+            response.set_data(current_app.json.dumps({"message": "Request deadline exceeded"}))
+            response.mimetype = "application/json"
+            response.status_code = 504
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop("load_slot", False):
+            with self._condition:
+                self._active -= 1
+                self._condition.notify()
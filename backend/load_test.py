@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Replay a traffic mix against a running server to find its saturation point.
+
+    python seed_load.py --users 5000 --messages 100000 --tokens-out tokens.json
+    python load_test.py --url http://localhost:5000 --tokens tokens.json --rps 25,50,100,200 --duration 30
+
+Requests are sent open-loop at each target rate (they do not wait for
+earlier ones to finish), picking an operation from the mix and a seeded
+user from the tokens file each time. After every step the achieved rate,
+latency percentiles and status codes are printed; the first step whose p99
+or error rate crosses the limits is reported as the saturation point.
+
+The mix defaults to what the frontend generates - mostly conversation polls
+and unread counts - and can be replaced with a recorded one, a JSON object
+of operation weights, e.g. {"poll": 60, "unread": 25, "send": 5, "search": 10}.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MIX = {
+    "poll": 45,
+    "unread": 20,
+    "conversations": 10,
+    "contacts": 10,
+    "groups": 3,
+    "search": 7,
+    "send": 5,
+}
+SEARCH_PREFIXES = ["a", "jo", "sa", "pri", "ch", "m", "wang", "s", "da", "li"]
+
+
+def build_request(operation, user, users):
+    """Return (method, path, body) for one operation performed by ``user``."""
+    partner = random.choice([other for other in random.sample(users, 2) if other is not user])
+    if operation == "poll":
+        return "GET", "/api/messages/conversation?" + urllib.parse.urlencode({"recipientEmail": partner["email"]}), None
+    if operation == "unread":
+        return "GET", "/api/messages/unread-count", None
+    if operation == "conversations":
+        return "GET", "/api/messages/conversations", None
+    if operation == "contacts":
+        return "GET", "/api/contacts?format=columnar&thumb=128", None
+    if operation == "groups":
+        return "GET", "/api/contacts/groups", None
+    if operation == "search":
+        return "GET", "/api/users/search?" + urllib.parse.urlencode({"email": random.choice(SEARCH_PREFIXES)}), None
+    if operation == "send":
+        return "POST", "/api/messages", {"recipientEmail": partner["email"], "text": "load test message"}
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def send(base_url, operation, user, users, timeout):
+    method, path, body = build_request(operation, user, users)
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    request.add_header("Authorization", f"Bearer {user['token']}")
+    request.add_header("Accept-Encoding", "gzip")
+    if data is not None:
+        request.add_header("Content-Type", "application/json")
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = "error"
+    return operation, status, time.monotonic() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_step(base_url, users, mix, rps, duration, workers, timeout):
+    operations, weights = zip(*mix.items())
+    results = []
+    results_lock = threading.Lock()
+    in_flight = threading.Semaphore(workers)
+    dropped = 0
+
+    def record(future):
+        in_flight.release()
+        with results_lock:
+            results.append(future.result())
+
+    total = int(rps * duration)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.monotonic()
+        for index in range(total):
+            delay = started + index / rps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # Every worker busy means the client, not the server, would set the pace
+            if not in_flight.acquire(blocking=False):
+                dropped += 1
+                continue
+            operation = random.choices(operations, weights)[0]
+            future = executor.submit(send, base_url, operation, random.choice(users), users, timeout)
+            future.add_done_callback(record)
+        sent_for = time.monotonic() - started
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(latency for _, status, latency in results if status == 200 or status == 201)
+    statuses = Counter(status for _, status, _ in results)
+    ok = sum(count for status, count in statuses.items() if status in (200, 201))
+    return {
+        "target_rps": rps,
+        "achieved_rps": ok / elapsed if elapsed else 0.0,
+        "sent": len(results),
+        "dropped": dropped,
+        "errors": len(results) - ok,
+        "statuses": dict(statuses),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "offered_rps": len(results) / sent_for if sent_for else 0.0,
+        "by_operation": Counter(operation for operation, _, _ in results),
+    }
+
+
+def print_step(step):
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(step["statuses"].items(), key=str))
+    print(
+        f"{step['target_rps']:>7.0f} rps target | {step['achieved_rps']:7.1f} ok/s | "
+        f"p50 {step['p50'] * 1000:6.0f}ms p95 {step['p95'] * 1000:6.0f}ms p99 {step['p99'] * 1000:6.0f}ms | "
+        f"errors {step['errors']}/{step['sent']} dropped {step['dropped']} | {statuses}"
+    )
+
+
+def load_mix(path):
+    if not path:
+        return dict(DEFAULT_MIX)
+    with open(path, encoding="utf-8") as mix_file:
+        mix = {operation: float(weight) for operation, weight in json.load(mix_file).items() if float(weight) > 0}
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    if not mix:
+        raise ValueError("Mix has no operations with a positive weight")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic mix at increasing request rates")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the running server")
+    parser.add_argument("--tokens", required=True, help="Tokens file written by seed_load.py --tokens-out")
+    parser.add_argument("--mix", help="JSON file of operation weights (default: built-in frontend mix)")
+    parser.add_argument("--rps", default="10,25,50,100", help="Comma separated request rates to step through")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run each step")
+    parser.add_argument("--workers", type=int, default=200, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--max-p99", type=float, default=1.0, help="p99 latency (seconds) counted as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate counted as saturated")
+    parser.add_argument("--json", help="Also write the step results to this file")
+    args = parser.parse_args()
+
+    try:
+        mix = load_mix(args.mix)
+        rates = [float(rate) for rate in args.rps.split(",") if rate.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.tokens, encoding="utf-8") as tokens_file:
+        users = json.load(tokens_file)
+    if len(users) < 2:
+        parser.error("The tokens file needs at least two users")
+
+    base_url = args.url.rstrip("/")
+    print(f"Replaying {mix} against {base_url} with {len(users)} users")
+    steps = []
+    saturated_at = None
+    for rps in rates:
+        step = run_step(base_url, users, mix, rps, args.duration, args.workers, args.timeout)
+        steps.append(step)
+        print_step(step)
+        error_rate = step["errors"] / step["sent"] if step["sent"] else 1.0
+        if step["p99"] > args.max_p99 or error_rate > args.max_error_rate or step["dropped"]:
+            saturated_at = rps
+            break
+
+    if saturated_at is None:
+        print(f"✅ No saturation up to {rates[-1]:.0f} rps")
+    else:
+        healthy = [step["target_rps"] for step in steps[:-1]]
+        last_good = f"; last healthy step {healthy[-1]:.0f} rps" if healthy else ""
+        print(f"❌ Saturated at {saturated_at:.0f} rps{last_good}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump(steps, results_file, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
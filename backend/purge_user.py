@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Export and permanently delete a user's account data.
+
+    python purge_user.py --email someone@example.com --export exports/someone.json
+    python purge_user.py --email someone@example.com --export-only --export exports/someone.json
+
+Contacts and messages are removed with batched DELETEs, each committed on
+its own, so purging a large account does not block other writers.
+"""
+import argparse
+import os
+import sys
+
+from app import PURGE_BATCH_SIZE, User, create_app, iter_user_export, purge_user_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and purge a user's data")
+    parser.add_argument("--email", required=True, help="Email of the user to purge")
+    parser.add_argument("--export", help="Write a JSON export of the user's data to this file first")
+    parser.add_argument("--export-only", action="store_true", help="Only write the export, do not delete anything")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="Rows deleted per batch")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+
+    if args.export_only and not args.export:
+        parser.error("--export-only requires --export")
+
+    app = create_app()
+    with app.app_context():
+        user = User.query.filter_by(email=args.email.strip().lower()).first()
+        if not user:
+            print(f"❌ No user with email {args.email}")
+            return 1
+        user_id = user.id
+
+        if args.export:
+            directory = os.path.dirname(args.export)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(args.export, "w", encoding="utf-8") as export_file:
+                for chunk in iter_user_export(user_id, args.batch_size):
+                    export_file.write(chunk)
+            print(f"✅ Exported user {user_id} to {args.export}")
+
+        if args.export_only:
+            return 0
+
+        if not args.yes:
+            answer = input(f"Permanently delete {args.email} and all their contacts and messages? [y/N] ")
+            if answer.strip().lower() != "y":
+                print("Aborted")
+                return 1
+
+        counts = purge_user_data(user_id, args.batch_size)
+        print(f"✅ Purged user {user_id}: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Rate limiting for the Contact Manager API.
+
+Every request spends a token from two buckets: a per-user budget shared by
+all routes and, when the route has its own limit, a per-route bucket for the
+same user. Buckets live in process memory by default; set
+RATELIMIT_STORAGE_URL to a redis:// URL so that all gunicorn workers on the
+host share the same budgets. If Redis becomes unreachable the buckets fall
+back to process memory until it answers again.
+"""
+import math
+import os
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Routes with their own budget on top of the per-user default
+DEFAULT_ROUTE_LIMITS = {
+    "login": "10/minute",
+    "register": "5/minute",
+    "search_users": "60/minute",
+    "get_conversation": "90/minute",
+    "get_conversations": "30/minute",
+}
+
+
+def parse_rate(value):
+    """Parse a limit such as ``"120/minute"`` into ``(capacity, tokens_per_second)``."""
+    try:
+        amount, period = str(value).strip().split("/", 1)
+        capacity = int(amount)
+        seconds = PERIODS[period.strip().lower().rstrip("s")]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{value}', expected e.g. '120/minute'")
+    if capacity <= 0:
+        raise ValueError(f"Invalid rate limit '{value}', amount must be positive")
+    return capacity, capacity / seconds
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process.
+
+    Buckets are spread over a fixed set of lock stripes so concurrent
+    requests for different users rarely wait on each other.
+    """
+
+    STRIPES = 64
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._stripes = [({}, threading.Lock()) for _ in range(self.STRIPES)]
+
+    def consume(self, key, capacity, rate, cost=1):
+        buckets, lock = self._stripes[hash(key) % self.STRIPES]
+        now = time.monotonic()
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            buckets[key] = (tokens, now)
+            if len(buckets) > self.MAX_KEYS // self.STRIPES:
+                self._prune(buckets, now)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+    @staticmethod
+    def _prune(buckets, now, idle_seconds=3600):
+        for key, (_, updated) in list(buckets.items()):
+            if now - updated > idle_seconds:
+                del buckets[key]
+
+
+def redis_outage_errors():
+    """Exceptions that mean the Redis server could not be reached."""
+    try:
+        from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    except ImportError:
+        return (ConnectionError, TimeoutError)
+    return (ConnectionError, TimeoutError, RedisConnectionError, RedisTimeoutError)
+
+
+class RedisBucketStore:
+    """Token buckets kept in Redis (or any server speaking its protocol).
+
+    Connecting is lazy, so an unreachable server only shows up when a
+    bucket is consumed. While that keeps happening, buckets are kept in
+    process memory instead and a warning is printed at most once every
+    ``WARN_INTERVAL`` seconds.
+    """
+
+    WARN_INTERVAL = 60
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis  # optional dependency, only needed for shared buckets
+
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._script = client.register_script(self.SCRIPT)
+        self._outage_errors = redis_outage_errors()
+        self._fallback = MemoryBucketStore()
+        self._warned_at = None
+
+    def consume(self, key, capacity, rate, cost=1):
+        try:
+            allowed, tokens = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time(), cost])
+        except self._outage_errors as e:
+            self._warn_outage(e)
+            return self._fallback.consume(key, capacity, rate, cost)
+        tokens = float(tokens)
+        allowed = bool(int(allowed))
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+    def _warn_outage(self, error):
+        now = time.monotonic()
+        if self._warned_at is not None and now - self._warned_at < self.WARN_INTERVAL:
+            return
+        self._warned_at = now
+        print(f"Warning: Redis rate limit store unreachable ({error}), using in-memory buckets")
+
+
+def create_store(url):
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            store = RedisBucketStore(url)
+            print("Rate limiting: using shared Redis bucket store")
+            return store
+        except Exception as e:
+            print(f"Warning: Redis rate limit store unavailable ({e}), falling back to in-memory buckets")
+    return MemoryBucketStore()
+
+
+class RateLimiter:
+    """Per-user and per-route request budgets for a Flask app."""
+
+    def __init__(self, app=None):
+        self.store = None
+        self.default_limit = None
+        self.route_limits = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", os.getenv("RATELIMIT_ENABLED", "true").lower() != "false")
+        app.config.setdefault("RATELIMIT_STORAGE_URL", os.getenv("RATELIMIT_STORAGE_URL"))
+        app.config.setdefault("RATELIMIT_DEFAULT", os.getenv("RATELIMIT_DEFAULT", "600/minute"))
+        app.config.setdefault("RATELIMIT_ROUTES", dict(DEFAULT_ROUTE_LIMITS))
+
+        self.store = create_store(app.config["RATELIMIT_STORAGE_URL"])
+        self.default_limit = parse_rate(app.config["RATELIMIT_DEFAULT"])
+        self.route_limits = {
+            endpoint: parse_rate(limit) for endpoint, limit in app.config["RATELIMIT_ROUTES"].items()
+        }
+
+        app.extensions["rate_limiter"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _client_key(self):
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        if identity:
+            return f"user:{identity}"
+        # remote_addr only honours X-Forwarded-For hops added by trusted
+        # proxies (TRUSTED_PROXY_HOPS), so clients cannot pick their own key
+        return f"ip:{request.remote_addr}"
+
+    def _before_request(self):
+        if request.method == "OPTIONS" or not current_app.config["RATELIMIT_ENABLED"]:
+            return None
+        endpoint = request.endpoint
+        if endpoint is None or endpoint == "health":
+            return None
+
+        client = self._client_key()
+        checks = [(f"{client}:*", self.default_limit)]
+        if endpoint in self.route_limits:
+            checks.append((f"{client}:{endpoint}", self.route_limits[endpoint]))
+
+        for key, (capacity, rate) in checks:
+            allowed, remaining, retry_after = self.store.consume(key, capacity, rate)
+            g.rate_limit = (capacity, remaining)
+            if not allowed:
+                return self._reject(429, "Too many requests. Please slow down.", retry_after)
+        return None
+
+    def _reject(self, status, message, retry_after):
+        response = jsonify({"message": message, "retryAfter": math.ceil(retry_after)})
+        response.status_code = status
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _after_request(self, response):
+        limit = g.get("rate_limit")
+        if limit:
+            capacity, remaining = limit
+            response.headers["X-RateLimit-Limit"] = str(capacity)
+            response.headers["X-RateLimit-Remaining"] = str(max(0, int(remaining)))
+        return response
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Move users between contact/message shards.
+
+    python rebalance_shards.py --report
+    python rebalance_shards.py --migrate-main
+    python rebalance_shards.py --email someone@example.com --to 2
+
+A move copies the user's contacts and messages to the target shard, records
+the new placement, waits for running app processes to pick it up, then
+copies whatever was written to the old shard in the meantime and removes the
+rows from it. The final pass carries over new contacts and messages and
+messages marked read; edits to or deletions of existing contacts made during
+the grace period are not, so run moves at quiet times.
+
+--migrate-main is the one-off step when turning sharding on for an existing
+deployment: it copies the contacts and messages stored in the main database
+onto each user's shard. Run it while the app is stopped, before starting the
+app with SHARD_DATABASE_URLS set (see README "Sharding").
+"""
+import argparse
+import sys
+import time
+import uuid
+
+from sqlalchemy import and_, func, or_, select
+
+from app import Contact, Message, ShardAssignment, User, create_app, db
+from sharding import ShardRouter
+
+BATCH_SIZE = 1000
+
+
+def involving(table, user_id):
+    return or_(table.c.sender_id == user_id, table.c.recipient_id == user_id)
+
+
+def backfill_global_ids(engine, user_id=None):
+    """Give older messages (the user's, or all of them) a global_id so their copies can be matched."""
+    table = Message.__table__
+    condition = table.c.global_id.is_(None)
+    if user_id is not None:
+        condition = and_(involving(table, user_id), condition)
+    with engine.begin() as connection:
+        ids = connection.execute(select(table.c.id).where(condition)).scalars().all()
+        for message_id in ids:
+            connection.execute(table.update().where(table.c.id == message_id).values(global_id=str(uuid.uuid4())))
+
+
+def copy_rows(source, target, table, condition, skip_global_ids=False):
+    """Copy matching rows from ``source`` to ``target`` in batches, letting the target assign ids."""
+    copied = 0
+    last_id = 0
+    columns = [column for column in table.columns if column.name != "id"]
+    while True:
+        with source.connect() as connection:
+            rows = connection.execute(
+                select(table).where(condition, table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+            ).mappings().all()
+        if not rows:
+            return copied
+        last_id = rows[-1]["id"]
+        with target.begin() as connection:
+            if skip_global_ids:
+                existing = set(connection.execute(
+                    select(table.c.global_id).where(table.c.global_id.in_([row["global_id"] for row in rows]))
+                ).scalars())
+                rows = [row for row in rows if row["global_id"] not in existing]
+            if rows:
+                connection.execute(table.insert(), [{column.name: row[column.name] for column in columns} for row in rows])
+        copied += len(rows)
+
+
+def max_id(engine, table, condition):
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(table.c.id)).where(condition)).scalar() or 0
+
+
+def copy_read_flags(source, target, user_id):
+    """Mark read on ``target`` the user's received messages that are read on ``source``."""
+    table = Message.__table__
+    condition = and_(table.c.recipient_id == user_id, table.c.read.is_(True), table.c.global_id.isnot(None))
+    with source.connect() as connection:
+        global_ids = connection.execute(select(table.c.global_id).where(condition)).scalars().all()
+    for start in range(0, len(global_ids), BATCH_SIZE):
+        with target.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(table.c.global_id.in_(global_ids[start:start + BATCH_SIZE]), table.c.read.is_(False))
+                .values(read=True)
+            )
+
+
+def delete_rows(engine, table, ids):
+    deleted = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        with engine.begin() as connection:
+            deleted += connection.execute(table.delete().where(table.c.id.in_(ids[start:start + BATCH_SIZE]))).rowcount
+    return deleted
+
+
+def move_user(router, user_id, target_index, grace_seconds):
+    router.forget(user_id)
+    source_key = router.shard_for_user(user_id)
+    target_key = router.bind_keys[target_index]
+    if source_key == target_key:
+        print(f"User {user_id} is already on {target_key}")
+        return
+    source, target = db.engines[source_key], db.engines[target_key]
+    contacts, messages = Contact.__table__, Message.__table__
+
+    user_contacts, user_messages = contacts.c.user_id == user_id, involving(messages, user_id)
+
+    # Rows up to these ids are copied now, later ones after the grace period
+    backfill_global_ids(source, user_id)
+    last_contact_id = max_id(source, contacts, user_contacts)
+    last_message_id = max_id(source, messages, user_messages)
+    copied_contacts = copy_rows(source, target, contacts, and_(user_contacts, contacts.c.id <= last_contact_id))
+    copied_messages = copy_rows(
+        source, target, messages, and_(user_messages, messages.c.id <= last_message_id), skip_global_ids=True
+    )
+    print(f"Copied {copied_contacts} contacts and {copied_messages} messages from {source_key} to {target_key}")
+
+    assignment = db.session.get(ShardAssignment, user_id) or ShardAssignment(user_id=user_id)
+    assignment.shard = target_index
+    db.session.add(assignment)
+    db.session.commit()
+    router.forget(user_id)
+
+    if grace_seconds:
+        print(f"Waiting {grace_seconds}s for app processes to pick up the new placement...")
+        time.sleep(grace_seconds)
+
+    # Catch up with what processes still using the old placement wrote meanwhile
+    backfill_global_ids(source, user_id)
+    copied_contacts = copy_rows(source, target, contacts, and_(user_contacts, contacts.c.id > last_contact_id))
+    copied_messages = copy_rows(
+        source, target, messages, and_(user_messages, messages.c.id > last_message_id), skip_global_ids=True
+    )
+    copy_read_flags(source, target, user_id)
+    print(f"Copied {copied_contacts} contacts and {copied_messages} messages written during the grace period")
+
+    # Keep message copies that the user's partners on the old shard still need
+    with source.connect() as connection:
+        contact_ids = connection.execute(select(contacts.c.id).where(user_contacts)).scalars().all()
+        rows = connection.execute(
+            select(messages.c.id, messages.c.sender_id, messages.c.recipient_id).where(user_messages)
+        ).all()
+    message_ids = [
+        message_id for message_id, sender_id, recipient_id in rows
+        if router.shard_for_user(recipient_id if sender_id == user_id else sender_id) != source_key
+    ]
+    print(
+        f"Removed {delete_rows(source, contacts, contact_ids)} contacts and "
+        f"{delete_rows(source, messages, message_ids)} messages from {source_key}"
+    )
+
+
+def migrate_main(router, purge):
+    """Copy contacts and messages kept in the main database onto the users' shards.
+
+    Each message is copied to both participants' shards. Users whose shard
+    already holds contacts are skipped and messages are matched on
+    global_id, so an interrupted run can simply be started again.
+    """
+    source = db.engine
+    contacts, messages = Contact.__table__, Message.__table__
+    backfill_global_ids(source)
+
+    user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    copied_contacts = copied_messages = 0
+    for user_id in user_ids:
+        target = db.engines[router.shard_for_user(user_id)]
+        with target.connect() as connection:
+            has_contacts = connection.execute(
+                select(contacts.c.id).where(contacts.c.user_id == user_id).limit(1)
+            ).first() is not None
+        if not has_contacts:
+            copied_contacts += copy_rows(source, target, contacts, contacts.c.user_id == user_id)
+        copied_messages += copy_rows(source, target, messages, involving(messages, user_id), skip_global_ids=True)
+    print(f"Copied {copied_contacts} contacts and {copied_messages} message copies for {len(user_ids)} users")
+
+    if purge:
+        with source.connect() as connection:
+            contact_ids = connection.execute(select(contacts.c.id)).scalars().all()
+            message_ids = connection.execute(select(messages.c.id)).scalars().all()
+        print(
+            f"Removed {delete_rows(source, contacts, contact_ids)} contacts and "
+            f"{delete_rows(source, messages, message_ids)} messages from the main database"
+        )
+
+
+def report(router):
+    users = db.session.query(User.id).all()
+    placement = {key: 0 for key in router.bind_keys}
+    for (user_id,) in users:
+        placement[router.shard_for_user(user_id)] += 1
+    for key in router.bind_keys:
+        with db.engines[key].connect() as connection:
+            contacts = connection.execute(select(func.count()).select_from(Contact.__table__)).scalar()
+            messages = connection.execute(select(func.count()).select_from(Message.__table__)).scalar()
+        print(f"{key}: {placement[key]} users, {contacts} contacts, {messages} messages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move users between shards")
+    parser.add_argument("--report", action="store_true", help="Print users and rows per shard")
+    parser.add_argument(
+        "--migrate-main", action="store_true",
+        help="Copy contacts and messages from the main database onto the shards",
+    )
+    parser.add_argument(
+        "--purge-main", action="store_true",
+        help="With --migrate-main, delete the copied rows from the main database afterwards",
+    )
+    parser.add_argument("--email", help="Email of the user to move")
+    parser.add_argument("--to", type=int, help="Index of the target shard in SHARD_DATABASE_URLS")
+    parser.add_argument(
+        "--grace", type=float, default=ShardRouter.ASSIGNMENT_TTL_SECONDS + 5,
+        help="Seconds to wait before deleting the old copies",
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+    router = app.extensions["shard_router"]
+    if not router.enabled:
+        print("❌ Sharding is not configured (set SHARD_DATABASE_URLS)")
+        return 1
+
+    with app.app_context():
+        if args.report:
+            report(router)
+            return 0
+        if args.migrate_main:
+            migrate_main(router, args.purge_main)
+            print("✅ Main database contacts and messages migrated to the shards")
+            return 0
+        if args.purge_main:
+            parser.error("--purge-main requires --migrate-main")
+        if not args.email or args.to is None:
+            parser.error("--email and --to are required to move a user")
+        if not 0 <= args.to < len(router.bind_keys):
+            parser.error(f"--to must be between 0 and {len(router.bind_keys) - 1}")
+        user = User.query.filter_by(email=args.email.strip().lower()).first()
+        if not user:
+            print(f"❌ No user with email {args.email}")
+            return 1
+        move_user(router, user.id, args.to, args.grace)
+        print(f"✅ Moved {args.email} to shard {args.to}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bulk-seed realistic test data for capacity planning.
+
+    python seed_load.py --users 10000 --contacts-per-user 40 --messages 200000 --tokens-out tokens.json
+
+Activity is skewed the way real usage is: a few users own most contacts and
+send most messages, access counts follow a long tail, and messages arrive in
+short back-and-forth threads. Rows are written with batched multi-row
+INSERTs straight to the right database (or shard). Seeded users share one
+password (default "password123") and ``--tokens-out`` writes JWTs for
+load_test.py.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from passlib.hash import bcrypt
+from sqlalchemy import select
+
+from app import Contact, Message, User, create_app, db, init_db
+from sharding import shard_router
+
+FIRST_NAMES = [
+    "james", "mary", "robert", "patricia", "john", "jennifer", "michael", "linda", "david", "elizabeth",
+    "william", "barbara", "richard", "susan", "joseph", "jessica", "thomas", "sarah", "priya", "arjun",
+    "sakshi", "rahul", "ananya", "wei", "mei", "hiroshi", "yuki", "omar", "fatima", "carlos", "sofia",
+]
+LAST_NAMES = [
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis", "martinez", "lopez",
+    "wilson", "anderson", "taylor", "thomas", "moore", "jackson", "patel", "sharma", "jawale", "kumar",
+    "chen", "wang", "tanaka", "sato", "hassan", "ali", "silva", "santos", "kim", "lee", "nguyen",
+]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", None]
+# (group, weight) - most contacts are ungrouped or in the built-in groups
+GROUPS = [(None, 30), ("work", 25), ("personal", 15), ("family", 15), ("friends", 10), ("gym", 3), ("school", 2)]
+MESSAGE_TEXTS = [
+    "Hey, how are you?", "Are we still on for tomorrow?", "Sounds good!", "Can you send me the file?",
+    "Thanks!", "On my way", "Call me when you get a chance", "Running 10 minutes late", "Got it, thanks",
+    "Let's catch up this weekend", "Did you see the update?", "👍",
+]
+
+
+def skewed(mean, cap, alpha=1.5):
+    """Pareto-distributed integer with roughly the given mean, capped at ``cap``."""
+    return min(cap, int(mean * (alpha - 1) / alpha * random.paretovariate(alpha)))
+
+
+def batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def engine_for_user(user_id):
+    router = shard_router()
+    return db.engines[router.shard_for_user(user_id)] if router.enabled else db.engine
+
+
+def insert_rows(table, rows_by_engine, batch_size):
+    inserted = 0
+    for engine, rows in rows_by_engine.items():
+        for batch in batches(rows, batch_size):
+            with engine.begin() as connection:
+                connection.execute(table.insert(), batch)
+            inserted += len(batch)
+    return inserted
+
+
+def seed_users(count, password, batch_size):
+    password_hash = bcrypt.hash(password)  # hashed once; bcrypt per user would dominate the run
+    run_id = uuid.uuid4().hex[:6]
+    now = datetime.utcnow()
+    rows = []
+    for index in range(count):
+        first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+        rows.append({
+            "name": f"{first.title()} {last.title()}",
+            "email": f"{first}.{last}.{run_id}{index}@example.com",
+            "password_hash": password_hash,
+            "created_at": now - timedelta(days=random.randint(0, 365)),
+        })
+
+    table = User.__table__
+    user_ids = []
+    for batch in batches(rows, batch_size):
+        with db.engine.begin() as connection:
+            connection.execute(table.insert(), batch)
+            user_ids += connection.execute(
+                select(table.c.id).where(table.c.email.in_([row["email"] for row in batch]))
+            ).scalars().all()
+    return user_ids
+
+
+def seed_contacts(user_ids, mean_per_user, batch_size):
+    groups, group_weights = zip(*GROUPS)
+    now = datetime.utcnow()
+    rows_by_engine = defaultdict(list)
+    for user_id in user_ids:
+        engine = engine_for_user(user_id)
+        for index in range(skewed(mean_per_user, mean_per_user * 20)):
+            first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            access_count = skewed(3, 500, alpha=1.2)
+            created_at = now - timedelta(days=random.randint(0, 365))
+            rows_by_engine[engine].append({
+                "user_id": user_id,
+                "name": f"{first.title()} {last.title()}",
+                "email": f"{first}.{last}{index}@example.org",
+                "phone": f"+1 555 {random.randint(100, 999)} {random.randint(1000, 9999)}",
+                "company": random.choice(COMPANIES),
+                "notes": None,
+                "photo_url": None,
+                "group": random.choices(groups, group_weights)[0],
+                "is_favorite": random.random() < 0.1,
+                "access_count": access_count,
+                "last_accessed": now - timedelta(hours=random.randint(0, 24 * 30)) if access_count else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+    return insert_rows(Contact.__table__, rows_by_engine, batch_size)
+
+
+def seed_messages(user_ids, total, batch_size):
+    # A few very active users account for most conversations
+    activity = [random.paretovariate(1.2) for _ in user_ids]
+    now = datetime.utcnow()
+    rows_by_engine = defaultdict(list)
+    written = 0
+    while written < total:
+        sender, recipient = random.choices(user_ids, activity, k=2)
+        if sender == recipient:
+            continue
+        # A short back-and-forth thread between the two users
+        timestamp = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+        for _ in range(min(total - written, random.randint(1, 12))):
+            timestamp += timedelta(seconds=random.randint(5, 600))
+            row = {
+                "sender_id": sender,
+                "recipient_id": recipient,
+                "text": random.choice(MESSAGE_TEXTS),
+                "read": timestamp < now - timedelta(hours=6) or random.random() < 0.5,
+                "created_at": min(timestamp, now),
+                "global_id": str(uuid.uuid4()),
+            }
+            sender_engine, recipient_engine = engine_for_user(sender), engine_for_user(recipient)
+            rows_by_engine[sender_engine].append(row)
+            if recipient_engine is not sender_engine:
+                rows_by_engine[recipient_engine].append(dict(row))
+            written += 1
+            if random.random() < 0.6:
+                sender, recipient = recipient, sender
+    insert_rows(Message.__table__, rows_by_engine, batch_size)
+    return written
+
+
+def write_tokens(path, user_ids, count):
+    table = User.__table__
+    sample = random.sample(user_ids, min(count, len(user_ids)))
+    with db.engine.connect() as connection:
+        emails = dict(connection.execute(select(table.c.id, table.c.email).where(table.c.id.in_(sample))).all())
+    tokens = [
+        {"id": user_id, "email": emails[user_id], "token": create_access_token(identity=str(user_id))}
+        for user_id in sample
+    ]
+    with open(path, "w", encoding="utf-8") as tokens_file:
+        json.dump(tokens, tokens_file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-seed users, contacts and messages")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users to create")
+    parser.add_argument("--contacts-per-user", type=int, default=40, help="Mean contacts per user")
+    parser.add_argument("--messages", type=int, default=20000, help="Total messages to create")
+    parser.add_argument("--password", default="password123", help="Password for every seeded user")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT batch")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible data")
+    parser.add_argument("--tokens-out", help="Write JWTs for seeded users to this JSON file")
+    parser.add_argument("--token-users", type=int, default=200, help="Number of users to write tokens for")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    app = create_app()
+    init_db(app)
+    with app.app_context():
+        started = time.monotonic()
+        user_ids = seed_users(args.users, args.password, args.batch_size)
+        print(f"Created {len(user_ids)} users")
+        contacts = seed_contacts(user_ids, args.contacts_per_user, args.batch_size)
+        print(f"Created {contacts} contacts")
+        messages = seed_messages(user_ids, args.messages, args.batch_size) if len(user_ids) > 1 else 0
+        print(f"Created {messages} messages")
+        if args.tokens_out:
+            write_tokens(args.tokens_out, user_ids, args.token_users)
+            print(f"Wrote tokens to {args.tokens_out}")
+        print(f"✅ Seeding finished in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
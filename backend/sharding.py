@@ -0,0 +1,166 @@
+"""
+Sharding of per-user data for the Contact Manager API.
+
+When SHARD_DATABASE_URLS is set, users stay in the main database while each
+user's contacts and messages live on one of the shard databases. A user is
+placed on shard ``user_id % N`` unless an explicit assignment (written by
+rebalance_shards.py) says otherwise. Messages between users on different
+shards are stored once on each side.
+
+The shard for the logged-in user is selected at the start of every request;
+code that works on another user's data wraps it in ``user_shard(user_id)``.
+
+Locally this can be tried with several SQLite files, e.g.
+SHARD_DATABASE_URLS=sqlite:///shard0.db,sqlite:///shard1.db
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import ForeignKeyConstraint, MetaData
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql.util import find_tables
+
+# Tables whose rows are stored on the owning user's shard
+SHARDED_TABLES = set()
+
+
+def sharded_table(cls):
+    """Class decorator marking a model's table as stored on user shards."""
+    SHARDED_TABLES.add(cls.__table__)
+    return cls
+
+
+def shard_bind_for(mapper=None, clause=None):
+    """Return the shard bind key for a statement, or None if it is not sharded."""
+    if not SHARDED_TABLES or not has_app_context():
+        return None
+    shard_key = g.get("db_shard")
+    if shard_key is None:
+        return None
+    table = getattr(mapper, "local_table", None)
+    if table is None and clause is not None:
+        table = getattr(clause, "table", None)
+    if table is None and clause is not None:
+        # Core selects and UNIONs carry no mapper; look at the tables they read
+        return shard_key if any(t in SHARDED_TABLES for t in find_tables(clause, include_crud=True)) else None
+    return shard_key if table in SHARDED_TABLES else None
+
+
+def shard_router():
+    return current_app.extensions["shard_router"]
+
+
+@contextmanager
+def user_shard(user_id):
+    """Route sharded queries inside the block to ``user_id``'s shard."""
+    router = shard_router()
+    if not router.enabled:
+        yield None
+        return
+    with router.using_shard(router.shard_for_user(user_id)) as shard_key:
+        yield shard_key
+
+
+class ShardRouter:
+    """Maps user ids to shard binds and selects the shard for each request."""
+
+    ASSIGNMENT_TTL_SECONDS = 30
+
+    def __init__(self, app=None, shard_urls=None, assignment_lookup=None):
+        self.bind_keys = []
+        self.assignment_lookup = assignment_lookup
+        self._assignments = {}
+        self._assignments_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, shard_urls, assignment_lookup)
+
+    @property
+    def enabled(self):
+        return bool(self.bind_keys)
+
+    def init_app(self, app, shard_urls=None, assignment_lookup=None):
+        if shard_urls is None:
+            shard_urls = [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()]
+        app.config.setdefault("SHARD_DATABASE_URLS", list(shard_urls))
+        if assignment_lookup is not None:
+            self.assignment_lookup = assignment_lookup
+
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        self.bind_keys = []
+        for index, url in enumerate(app.config["SHARD_DATABASE_URLS"]):
+            key = f"shard_{index}"
+            binds[key] = url
+            self.bind_keys.append(key)
+
+        app.extensions["shard_router"] = self
+        if self.bind_keys:
+            print(f"Sharding contacts and messages across {len(self.bind_keys)} databases")
+            app.before_request(self._before_request)
+
+    def shard_for_user(self, user_id):
+        """Return the bind key of the shard holding ``user_id``'s data."""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._assignments_lock:
+            cached = self._assignments.get(user_id)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        index = None
+        if self.assignment_lookup is not None:
+            index = self.assignment_lookup(user_id)
+        if index is None or not 0 <= index < len(self.bind_keys):
+            index = user_id % len(self.bind_keys)
+        key = self.bind_keys[index]
+        with self._assignments_lock:
+            self._assignments[user_id] = (key, now + self.ASSIGNMENT_TTL_SECONDS)
+        return key
+
+    def forget(self, user_id):
+        with self._assignments_lock:
+            self._assignments.pop(int(user_id), None)
+
+    @contextmanager
+    def using_shard(self, shard_key):
+        previous = g.get("db_shard")
+        g.db_shard = shard_key
+        try:
+            yield shard_key
+        finally:
+            g.db_shard = previous
+
+    def _before_request(self):
+        g.db_shard = None
+        try:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity()
+        except Exception:
+            user_id = None
+        if user_id is not None:
+            g.db_shard = self.shard_for_user(user_id)
+
+    def create_shard_tables(self, db):
+        """Create the sharded tables on every shard.
+
+        Foreign keys to tables kept in the main database are left out, since
+        a shard cannot reference rows it does not hold.
+        """
+        metadata = MetaData()
+        for table in SHARDED_TABLES:
+            copy = table.to_metadata(metadata)
+            for constraint in [c for c in copy.constraints if isinstance(c, ForeignKeyConstraint)]:
+                copy.constraints.discard(constraint)
+            for column in copy.columns:
+                column.foreign_keys.clear()
+            copy.foreign_keys.clear()
+        for key in self.bind_keys:
+            metadata.create_all(db.engines[key])
+            # create_all() skips existing tables, so add indexes introduced since
+            with db.engines[key].begin() as connection:
+                for table in metadata.sorted_tables:
+                    for index in table.indexes:
+                        connection.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,46 @@
+"""
+Tests for account deletion.
+
+    python -m pytest test_account.py
+"""
+from app import Job, User, db, init_db
+from worker import run_pending
+
+
+def test_deleted_account_is_locked_and_its_id_not_reused(app, client, register):
+    register(client, "a")
+    b = register(client, "b")
+
+    assert client.delete("/api/account", json={"password": "pw"}, headers=b).status_code == 202
+    assert client.get("/api/auth/me", headers=b).status_code == 401
+    assert client.post("/api/auth/login", json={"email": "b@example.com", "password": "pw"}).status_code == 403
+
+    with app.app_context():
+        run_pending()
+    c = register(client, "c")
+    assert client.get("/api/auth/me", headers=b).status_code == 401
+    assert client.get("/api/auth/me", headers=c).get_json()["user"]["email"] == "c@example.com"
+
+
+def test_failed_purge_is_requeued(app, client, register):
+    a = register(client, "a")
+    with app.app_context():
+        db.session.add(Job(kind="purge_user", payload="{}", idempotency_key="purge-user:1", status="failed"))
+        db.session.commit()
+
+    assert client.delete("/api/account", json={"password": "pw"}, headers=a).status_code == 202
+    with app.app_context():
+        run_pending()
+        assert db.session.get(User, 1) is None
+        assert Job.query.filter_by(idempotency_key="purge-user:1").one().status == "done"
+
+
+def test_init_db_drops_jobs_without_a_handler(app):
+    with app.app_context():
+        db.session.add(Job(kind="mark_conversation_read", payload="{}", status="pending"))
+        db.session.add(Job(kind="mark_conversation_read", payload="{}", status="done"))
+        db.session.commit()
+
+    init_db(app)
+    with app.app_context():
+        assert [job.status for job in Job.query.filter_by(kind="mark_conversation_read")] == ["done"]
@@ -0,0 +1,56 @@
+"""
+Tests for the contact list endpoints.
+
+    python -m pytest test_contacts.py
+"""
+import gzip
+import json
+
+
+def add_contacts(client, headers, count, **fields):
+    for index in range(count):
+        contact = {"name": f"Contact {index:02d}", "email": f"contact{index}@example.com", **fields}
+        assert client.post("/api/contacts", json=contact, headers=headers).status_code == 201
+
+
+def test_columnar_contacts_are_gzipped(client, register):
+    headers = register(client, "a")
+    add_contacts(client, headers, 20, company="Example Ltd")
+
+    response = client.get("/api/contacts?format=columnar", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    body = json.loads(gzip.decompress(response.get_data()))
+    assert body["format"] == "columnar"
+    assert body["count"] == 20
+    assert body["contacts"]["name"] == [f"Contact {index:02d}" for index in range(20)]
+    assert body["contacts"]["company"] == ["Example Ltd"] * 20
+
+
+def test_small_responses_are_not_compressed(client, register):
+    headers = register(client, "a")
+
+    response = client.get("/api/contacts", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == {"contacts": []}
+
+
+def test_group_counts(client, register):
+    headers = register(client, "a")
+    add_contacts(client, headers, 3, group="Work")
+    add_contacts(client, headers, 1, group="family")
+    add_contacts(client, headers, 2)
+    contacts = client.get("/api/contacts", headers=headers).get_json()["contacts"]
+    client.post(f"/api/contacts/{contacts[0]['id']}/toggle-favorite", headers=headers)
+
+    other = register(client, "b")
+    add_contacts(client, other, 4, group="Work")
+
+    groups = client.get("/api/contacts/groups", headers=headers).get_json()
+    assert groups == {
+        "groups": [{"name": "family", "count": 1}, {"name": "Work", "count": 3}],
+        "total": 6,
+        "favorites": 1,
+        "ungrouped": 2,
+    }
@@ -0,0 +1,76 @@
+"""
+Tests for thumbnails and conditional GETs.
+
+    python -m pytest test_http_cache.py
+"""
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+CLOUDINARY_PHOTO = "https://res.cloudinary.com/demo/image/upload/v1/contacts/a.jpg"
+
+
+def test_thumbnails_are_snapped_to_supported_sizes(client, register):
+    headers = register(client, "a")
+    client.post("/api/contacts", json={"name": "Cloud", "email": "c@example.com", "photo": CLOUDINARY_PHOTO}, headers=headers)
+    client.post("/api/contacts", json={"name": "Other", "email": "o@example.com", "photo": "https://example.com/o.png"}, headers=headers)
+
+    contacts = client.get("/api/contacts?thumb=100", headers=headers).get_json()["contacts"]
+    assert [contact["photoThumbnail"] for contact in contacts] == [
+        "https://res.cloudinary.com/demo/image/upload/c_fill,g_face,w_128,h_128,f_auto,q_auto/v1/contacts/a.jpg",
+        "https://example.com/o.png",
+    ]
+    contacts = client.get("/api/contacts", headers=headers).get_json()["contacts"]
+    assert [contact["photoThumbnail"] for contact in contacts] == [None, None]
+
+
+def test_contact_list_revalidates_with_etag(client, register):
+    headers = register(client, "a")
+    client.post("/api/contacts", json={"name": "Carol", "email": "carol@example.com"}, headers=headers)
+
+    first = client.get("/api/contacts", headers=headers)
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    assert client.get("/api/contacts", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    contact_id = first.get_json()["contacts"][0]["id"]
+    client.put(f"/api/contacts/{contact_id}", json={"company": "Example Ltd"}, headers=headers)
+    changed = client.get("/api/contacts", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["contacts"][0]["company"] == "Example Ltd"
+
+
+def test_conversation_changes_when_newest_message_is_deleted(client, register):
+    alice = register(client, "alice")
+    register(client, "bob")
+    for text in ("first", "second"):
+        client.post("/api/messages", json={"recipientEmail": "bob@example.com", "text": text}, headers=alice)
+
+    path = "/api/messages/conversation?recipientEmail=bob@example.com"
+    first = client.get(path, headers=alice)
+    etag = first.headers["ETag"]
+    assert "Last-Modified" not in first.headers
+    assert client.get(path, headers={**alice, "If-None-Match": etag}).status_code == 304
+
+    newest = first.get_json()["messages"][-1]["id"]
+    assert client.delete(f"/api/messages/{newest}", headers=alice).status_code == 200
+
+    since = http_date(datetime.utcnow() + timedelta(minutes=1))
+    for validators in ({"If-None-Match": etag}, {"If-Modified-Since": since}):
+        response = client.get(path, headers={**alice, **validators})
+        assert response.status_code == 200
+        assert [m["text"] for m in response.get_json()["messages"]] == ["first"]
+
+
+def test_conversation_changes_when_messages_are_read(client, register):
+    alice = register(client, "alice")
+    bob = register(client, "bob")
+    client.post("/api/messages", json={"recipientEmail": "bob@example.com", "text": "hi"}, headers=alice)
+
+    path = "/api/messages/conversation?recipientEmail=bob@example.com"
+    etag = client.get(path, headers=alice).headers["ETag"]
+    client.post("/api/messages/conversation/read", json={"recipientEmail": "alice@example.com"}, headers=bob)
+
+    response = client.get(path, headers={**alice, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["messages"][0]["read"] is True
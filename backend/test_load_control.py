@@ -0,0 +1,41 @@
+"""
+Tests for the concurrency limiter.
+
+    python -m pytest test_load_control.py
+"""
+import threading
+
+
+def test_expensive_routes_are_shed_while_others_queue(make_app, register, monkeypatch):
+    monkeypatch.setenv("MAX_CONCURRENT_REQUESTS", "1")
+    app = make_app()
+    client = app.test_client()
+    headers = register(client, "a")
+
+    load_control = app.extensions["load_control"]
+    load_control._active = 1  # another request holds the only slot
+
+    assert client.get("/api/users/search?email=a", headers=headers).status_code == 503
+
+    def release():
+        with load_control._condition:
+            load_control._active -= 1
+            load_control._condition.notify()
+
+    threading.Timer(0.2, release).start()
+    assert client.get("/api/contacts", headers=headers).status_code == 200
+
+
+def test_rate_limit_is_checked_before_taking_a_slot(make_app, monkeypatch):
+    monkeypatch.setenv("RATELIMIT_ENABLED", "true")
+    monkeypatch.setenv("MAX_CONCURRENT_REQUESTS", "1")
+    client = make_app().test_client()
+
+    def login():
+        return client.post("/api/auth/login", json={"email": "nobody@example.com", "password": "wrong"})
+
+    for _ in range(10):
+        login()
+    client.application.extensions["load_control"]._active = 1
+
+    assert login().status_code == 429
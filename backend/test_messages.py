@@ -0,0 +1,32 @@
+"""
+Tests for the bulk message endpoints.
+
+    python -m pytest test_messages.py
+"""
+import pytest
+
+import app as app_module
+
+
+@pytest.mark.parametrize("path", [
+    "/api/messages/bulk/read", "/api/messages/conversation/read", "/api/messages/bulk/delete",
+])
+@pytest.mark.parametrize("body", ["[1]", '"text"', "{not json"])
+def test_bulk_endpoints_reject_bodies_that_are_not_objects(client, register, path, body):
+    headers = {**register(client, "a"), "Content-Type": "application/json"}
+
+    response = client.post(path, data=body, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Request body must be a JSON object"
+
+
+def test_search_ranks_only_recent_partners_first(client, register, monkeypatch):
+    monkeypatch.setattr(app_module, "SEARCH_PARTNER_MESSAGES", 2)
+    alice = register(client, "alice")
+    for name in ("sam1", "sam2", "sam3"):
+        register(client, name)
+    for name in ("sam3", "sam2", "sam2"):
+        client.post("/api/messages", json={"recipientEmail": f"{name}@example.com", "text": "hi"}, headers=alice)
+
+    users = client.get("/api/users/search?email=sam", headers=alice).get_json()["users"]
+    assert [user["email"] for user in users] == ["sam2@example.com", "sam1@example.com", "sam3@example.com"]
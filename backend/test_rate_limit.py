@@ -0,0 +1,49 @@
+"""
+Tests for request rate limiting.
+
+    python -m pytest test_rate_limit.py
+"""
+import pytest
+
+from rate_limit import RedisBucketStore
+
+
+@pytest.fixture
+def client(make_app, monkeypatch):
+    monkeypatch.setenv("RATELIMIT_ENABLED", "true")
+    monkeypatch.setenv("TRUSTED_PROXY_HOPS", "1")
+    return make_app().test_client()
+
+
+def test_login_limit_ignores_client_supplied_forwarded_for(client):
+    statuses = [
+        client.post(
+            "/api/auth/login",
+            json={"email": "nobody@example.com", "password": "wrong"},
+            headers={"X-Forwarded-For": f"10.0.0.{attempt}, 203.0.113.9"},
+        ).status_code
+        for attempt in range(12)
+    ]
+    assert statuses[:10] == [401] * 10
+    assert statuses[10:] == [429, 429]
+
+
+class UnreachableRedis:
+    """Stands in for a redis client whose server is down."""
+
+    def register_script(self, script):
+        def run(keys, args):
+            raise ConnectionError("Connection refused")
+        return run
+
+
+def test_unreachable_redis_falls_back_to_memory_buckets(client, capsys):
+    limiter = client.application.extensions["rate_limiter"]
+    limiter.store = RedisBucketStore(client=UnreachableRedis())
+
+    statuses = [
+        client.post("/api/auth/login", json={"email": "nobody@example.com", "password": "wrong"}).status_code
+        for _ in range(11)
+    ]
+    assert statuses == [401] * 10 + [429]
+    assert capsys.readouterr().out.count("Redis rate limit store unreachable") == 1
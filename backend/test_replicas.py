@@ -0,0 +1,17 @@
+"""
+Tests for read-replica routing.
+
+    python -m pytest test_replicas.py
+"""
+import shutil
+
+
+def test_new_user_reads_own_account_from_primary(make_app, register, tmp_path):
+    app = make_app(replica_urls=[f"sqlite:///{tmp_path / 'replica.db'}"])
+    # A replica that never catches up
+    shutil.copy(tmp_path / "main.db", tmp_path / "replica.db")
+
+    client = app.test_client()
+    headers = register(client, "a")
+
+    assert client.get("/api/auth/me", headers=headers).get_json()["user"]["email"] == "a@example.com"
@@ -0,0 +1,99 @@
+"""
+Tests for sharded contacts and messages.
+
+    python -m pytest test_sharding.py
+"""
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+import rebalance_shards
+from app import Contact, Message, db
+from rebalance_shards import migrate_main
+
+
+@pytest.fixture
+def shard_urls(tmp_path):
+    return [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(2)]
+
+
+@pytest.fixture
+def app(make_app, shard_urls):
+    return make_app(shard_urls=shard_urls)
+
+
+def test_search_ranks_partners_on_other_shards_first(client, register):
+    alice = register(client, "alice")
+    for index in range(12):
+        register(client, f"bob{index:02d}")
+
+    response = client.post("/api/messages", json={"recipientEmail": "bob11@example.com", "text": "hi"}, headers=alice)
+    assert response.status_code == 201
+
+    users = client.get("/api/users/search?email=bob", headers=alice).get_json()["users"]
+    assert len(users) == 10
+    assert users[0]["email"] == "bob11@example.com"
+
+
+def test_message_visible_to_both_sides_across_shards(client, register):
+    alice = register(client, "alice")
+    bob = register(client, "bob")
+
+    client.post("/api/messages", json={"recipientEmail": "bob@example.com", "text": "hello"}, headers=alice)
+
+    for headers, partner in ((alice, "bob"), (bob, "alice")):
+        messages = client.get(f"/api/messages/conversation?recipientEmail={partner}@example.com", headers=headers)
+        assert [m["text"] for m in messages.get_json()["messages"]] == ["hello"]
+
+
+def test_migrate_main_moves_existing_rows_onto_shards(make_app, register, shard_urls):
+    client = make_app().test_client()
+    alice = register(client, "alice")
+    bob = register(client, "bob")
+    client.post("/api/contacts", json={"name": "Carol", "email": "carol@example.com"}, headers=alice)
+    client.post("/api/messages", json={"recipientEmail": "bob@example.com", "text": "before"}, headers=alice)
+
+    sharded = make_app(shard_urls=shard_urls)
+    with sharded.app_context():
+        migrate_main(sharded.extensions["shard_router"], purge=True)
+        migrate_main(sharded.extensions["shard_router"], purge=False)
+
+    client = sharded.test_client()
+    contacts = client.get("/api/contacts", headers=alice).get_json()["contacts"]
+    assert [contact["name"] for contact in contacts] == ["Carol"]
+    for headers, partner in ((alice, "bob"), (bob, "alice")):
+        messages = client.get(f"/api/messages/conversation?recipientEmail={partner}@example.com", headers=headers)
+        assert [m["text"] for m in messages.get_json()["messages"]] == ["before"]
+
+
+def test_move_user_keeps_writes_made_during_the_grace_period(app, client, register, monkeypatch):
+    alice = register(client, "alice")
+    bob = register(client, "bob")
+    client.post("/api/contacts", json={"name": "Carol", "email": "carol@example.com"}, headers=alice)
+    client.post("/api/messages", json={"recipientEmail": "alice@example.com", "text": "hello"}, headers=bob)
+
+    router = app.extensions["shard_router"]
+    contacts, messages = Contact.__table__, Message.__table__
+
+    def stale_writes(seconds):
+        # A process that has not seen the new placement keeps writing to the old shard
+        global_id = str(uuid.uuid4())
+        with db.engines[router.bind_keys[1]].begin() as connection:
+            connection.execute(contacts.insert().values(user_id=1, name="Dave", email="dave@example.com"))
+            connection.execute(messages.update().where(messages.c.recipient_id == 1).values(read=True))
+            connection.execute(messages.insert().values(sender_id=1, recipient_id=2, text="late", global_id=global_id))
+        with db.engines[router.bind_keys[0]].begin() as connection:
+            connection.execute(messages.insert().values(sender_id=1, recipient_id=2, text="late", global_id=global_id))
+
+    monkeypatch.setattr(rebalance_shards.time, "sleep", stale_writes)
+    with app.app_context():
+        assert router.shard_for_user(1) == router.bind_keys[1]
+        rebalance_shards.move_user(router, 1, 0, grace_seconds=1)
+        with db.engines[router.bind_keys[1]].connect() as connection:
+            assert connection.execute(select(func.count()).select_from(contacts)).scalar() == 0
+
+    names = [contact["name"] for contact in client.get("/api/contacts", headers=alice).get_json()["contacts"]]
+    assert names == ["Carol", "Dave"]
+    conversation = client.get("/api/messages/conversation?recipientEmail=bob@example.com", headers=alice).get_json()
+    assert [(m["text"], m["read"]) for m in conversation["messages"]] == [("hello", True), ("late", False)]
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Background job worker.
+
+Runs jobs queued with app.enqueue_job(). Start it next to the web process:
+
+    python worker.py                 # run until stopped
+    python worker.py --once          # drain due jobs and exit
+    python worker.py --stats         # print queue counts and exit
+
+wsgi.py also starts an embedded worker thread unless JOBS_EMBEDDED_WORKER=false.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import JOB_HANDLERS, Job, create_app, db, enqueue_job
+
+POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+BATCH_SIZE = int(os.getenv("JOBS_BATCH_SIZE", "20"))
+BACKOFF_BASE_SECONDS = float(os.getenv("JOBS_BACKOFF_BASE", "5"))
+BACKOFF_MAX_SECONDS = 3600
+# Jobs left "running" longer than this by a crashed worker are picked up again
+STALE_LOCK_SECONDS = 300
+METRICS_INTERVAL = 60
+
+metrics = {"processed": 0, "failed": 0, "retried": 0, "total_seconds": 0.0}
+
+
+def claim_jobs(limit=BATCH_SIZE):
+    """Claim up to ``limit`` due jobs for this worker.
+
+    Each job is claimed with a conditional UPDATE so several workers can
+    poll the same table without locking it.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+    candidates = db.session.query(Job.id).filter(
+        db.or_(
+            db.and_(Job.status == "pending", Job.run_at <= now),
+            db.and_(Job.status == "running", Job.locked_at < stale),
+        )
+    ).order_by(Job.run_at.asc()).limit(limit).all()
+
+    claimed = []
+    for (job_id,) in candidates:
+        updated = Job.query.filter(
+            Job.id == job_id,
+            db.or_(Job.status == "pending", db.and_(Job.status == "running", Job.locked_at < stale)),
+        ).update({"status": "running", "locked_at": now, "attempts": Job.attempts + 1}, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def run_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return
+    started = time.monotonic()
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        handler(json.loads(job.payload or "{}"))
+        job = db.session.get(Job, job_id)
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        db.session.commit()
+        metrics["processed"] += 1
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            metrics["failed"] += 1
+            print(f"Job {job.id} ({job.kind}) failed permanently: {e}")
+        else:
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** (job.attempts - 1), BACKOFF_MAX_SECONDS)
+            job.status = "pending"
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            metrics["retried"] += 1
+            print(f"Job {job.id} ({job.kind}) failed, retrying in {delay:.0f}s: {e}")
+        db.session.commit()
+    finally:
+        metrics["total_seconds"] += time.monotonic() - started
+
+
+def run_pending(limit=BATCH_SIZE):
+    """Run one batch of due jobs. Returns the number of jobs run."""
+    job_ids = claim_jobs(limit)
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
+
+
+def queue_stats():
+    counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+    oldest_pending = db.session.query(db.func.min(Job.run_at)).filter(Job.status == "pending").scalar()
+    lag = (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0
+    return {
+        "pending": counts.get("pending", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "lagSeconds": max(0, round(lag, 1)),
+    }
+
+
+def log_metrics():
+    processed = metrics["processed"] + metrics["failed"] + metrics["retried"]
+    average_ms = metrics["total_seconds"] / processed * 1000 if processed else 0
+    print(
+        f"Jobs: processed={metrics['processed']} retried={metrics['retried']} "
+        f"failed={metrics['failed']} avg={average_ms:.1f}ms queue={queue_stats()}"
+    )
+
+
+def run_worker(app, once=False, stop_event=None):
+    with app.app_context():
+        last_metrics = time.monotonic()
+        last_purge_day = None
+        while stop_event is None or not stop_event.is_set():
+            try:
+                # Daily cleanup of finished jobs; the key keeps it to one job per day across workers
+                today = datetime.utcnow().date()
+                if today != last_purge_day:
+                    enqueue_job("purge_finished_jobs", {"days": 7}, idempotency_key=f"purge:{today}")
+                    last_purge_day = today
+                ran = run_pending()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Job worker error: {e}")
+                ran = 0
+            finally:
+                db.session.remove()
+
+            if once and not ran:
+                break
+            if time.monotonic() - last_metrics > METRICS_INTERVAL:
+                log_metrics()
+                last_metrics = time.monotonic()
+            if not ran:
+                time.sleep(POLL_INTERVAL)
+
+
+def start_worker_thread(app):
+    """Run the worker in a daemon thread inside the web process."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(app,), kwargs={"stop_event": stop_event}, daemon=True)
+    thread.start()
+    return stop_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--once", action="store_true", help="Run all due jobs, then exit")
+    parser.add_argument("--stats", action="store_true", help="Print queue statistics and exit")
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.stats:
+        with app.app_context():
+            print(json.dumps(queue_stats(), indent=2))
+        return
+
+    print("Job worker started")
+    try:
+        run_worker(app, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    with app.app_context():
+        log_metrics()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 """
 WSGI entry point for production deployment
 """
+import os
+
 from app import create_app, init_db
+from worker import start_worker_thread
 
 app = create_app()
 
@@ -12,6 +15,10 @@ except Exception as e:
     print(f"Note: Database initialization: {e}")
     print("Database will be initialized on first request if needed.")
 
+# Run background jobs in this process unless a separate `python worker.py` is deployed
+if os.getenv("JOBS_EMBEDDED_WORKER", "true").lower() != "false":
+    start_worker_thread(app)
+
 if __name__ == "__main__":
     app.run()
 
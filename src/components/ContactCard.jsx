@@ -97,7 +97,7 @@ const ContactCard = ({ contact, onEdit, onMessage }) => {
       <div className="flex items-center mb-4 group">
         {contact.photo ? (
           <img
-            src={contact.photo}
+            src={contact.photoThumbnail || contact.photo}
             alt={contact.name}
             className="w-16 h-16 rounded-full object-cover border-4 border-purple-200 shadow-md mr-4"
           />
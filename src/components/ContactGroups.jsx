@@ -4,7 +4,7 @@ import { useState } from "react"
 import { useContacts } from "../context/ContactContext"
 
 const ContactGroups = () => {
-  const { allContacts, selectedGroup, setSelectedGroup } = useContacts()
+  const { groupStats, selectedGroup, setSelectedGroup } = useContacts()
 
   const [showGroups, setShowGroups] = useState(false)
   const [newGroupName, setNewGroupName] = useState("")
@@ -12,15 +12,14 @@ const ContactGroups = () => {
 
   // Get all unique groups
   const groups = ["all", "work", "personal", "family", "friends"]
-  const customGroups = Array.from(
-    new Set(allContacts.map((c) => c.group).filter((g) => g && !groups.includes(g))),
-  )
+  const customGroups = groupStats.groups.map((g) => g.name).filter((g) => !groups.includes(g))
 
   const allGroups = [...groups, ...customGroups]
 
   const getGroupCount = (groupName) => {
-    if (groupName === "all") return allContacts.length
-    return allContacts.filter((c) => c.group === groupName).length
+    if (groupName === "all") return groupStats.total
+    const group = groupStats.groups.find((g) => g.name === groupName)
+    return group ? group.count : 0
   }
 
   const handleAddGroup = () => {
@@ -21,6 +21,7 @@ export const ContactProvider = ({ children }) => {
   const [searchTerm, setSearchTerm] = useState("")
   const [sortBy, setSortBy] = useState("name") // 'name', 'favorites', 'frequent'
   const [selectedGroup, setSelectedGroup] = useState("all")
+  const [groupStats, setGroupStats] = useState({ groups: [], total: 0, favorites: 0, ungrouped: 0 })
 
   // Load contacts from API when user changes
   useEffect(() => {
@@ -32,6 +33,34 @@ export const ContactProvider = ({ children }) => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [user]) // loadContacts is stable, no need to include it
 
+  // Group counts come from their own small request, so the sidebar renders
+  // without waiting for the full contact list
+  useEffect(() => {
+    if (user) {
+      loadGroupStats()
+    } else {
+      setGroupStats({ groups: [], total: 0, favorites: 0, ungrouped: 0 })
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [user]) // loadGroupStats is stable, no need to include it
+
+  // Group names and counts are aggregated on the server so the sidebar
+  // doesn't depend on the (possibly filtered) contact list
+  const loadGroupStats = async () => {
+    if (!user) return
+    try {
+      const data = await contactsAPI.getGroups()
+      setGroupStats({
+        groups: data.groups || [],
+        total: data.total || 0,
+        favorites: data.favorites || 0,
+        ungrouped: data.ungrouped || 0,
+      })
+    } catch (error) {
+      console.error("Failed to load contact groups:", error)
+    }
+  }
+
   const loadContacts = async () => {
     if (!user) return
     setLoading(true)
@@ -47,6 +76,9 @@ export const ContactProvider = ({ children }) => {
     }
   }
 
+  // Contacts and group counts both change after an edit
+  const refreshContactsAndGroups = () => Promise.all([loadContacts(), loadGroupStats()])
+
   // Reload contacts when search, sort, or group changes
   useEffect(() => {
     if (user) {
@@ -60,7 +92,7 @@ export const ContactProvider = ({ children }) => {
       console.log("Adding contact:", contactData)
       const data = await contactsAPI.create(contactData)
       console.log("Contact added successfully:", data)
-      await loadContacts() // Reload to get updated list
+      await refreshContactsAndGroups() // Reload to get updated list and counts
       return data
     } catch (error) {
       console.error("Failed to add contact:", error)
@@ -72,7 +104,7 @@ export const ContactProvider = ({ children }) => {
   const updateContact = async (id, contactData) => {
     try {
       const data = await contactsAPI.update(id, contactData)
-      await loadContacts() // Reload to get updated list
+      await refreshContactsAndGroups() // Reload to get updated list and counts
       return data
     } catch (error) {
       console.error("Failed to update contact:", error)
@@ -83,7 +115,7 @@ export const ContactProvider = ({ children }) => {
   const deleteContact = async (id) => {
     try {
       await contactsAPI.delete(id)
-      await loadContacts() // Reload to get updated list
+      await refreshContactsAndGroups() // Reload to get updated list and counts
     } catch (error) {
       console.error("Failed to delete contact:", error)
       throw error
@@ -93,7 +125,7 @@ export const ContactProvider = ({ children }) => {
   const toggleFavorite = async (id) => {
     try {
       await contactsAPI.toggleFavorite(id)
-      await loadContacts() // Reload to get updated list
+      await refreshContactsAndGroups() // Reload to get updated list and counts
     } catch (error) {
       console.error("Failed to toggle favorite:", error)
       throw error
@@ -186,12 +218,13 @@ export const ContactProvider = ({ children }) => {
     setSortBy,
     selectedGroup,
     setSelectedGroup,
+    groupStats,
     addContact,
     updateContact,
     deleteContact,
     toggleFavorite,
     incrementAccessCount,
-    refreshContacts: loadContacts,
+    refreshContacts: refreshContactsAndGroups,
   }
 
   return <ContactContext.Provider value={value}>{children}</ContactContext.Provider>
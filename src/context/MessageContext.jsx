@@ -84,11 +84,16 @@ export const MessageProvider = ({ children }) => {
     }
   }
 
-  // Mark messages as read (handled automatically when fetching conversation)
+  // Mark every message in a conversation as read in one request
   const markAsRead = async (recipientEmail) => {
-    // This is handled automatically when fetching conversation
-    // But we can refresh unread count
-    await loadUnreadCount()
+    if (!user || !recipientEmail) return
+    try {
+      const data = await messagesAPI.markConversationAsRead(recipientEmail)
+      setUnreadCount(data.unreadCount || 0)
+    } catch (error) {
+      console.error("Failed to mark conversation as read:", error)
+      await loadUnreadCount()
+    }
   }
 
   const value = {
@@ -83,6 +83,20 @@ const apiRequest = async (endpoint, options = {}) => {
   }
 }
 
+// Expand a columnar payload ({ key: [values...] }) back into an array of objects
+const fromColumnar = (columns, count) => {
+  const keys = Object.keys(columns || {})
+  const rows = new Array(count)
+  for (let i = 0; i < count; i++) {
+    const row = {}
+    for (const key of keys) {
+      row[key] = columns[key][i]
+    }
+    rows[i] = row
+  }
+  return rows
+}
+
 // Auth API
 export const authAPI = {
   register: async (name, email, password) => {
@@ -123,9 +137,18 @@ export const contactsAPI = {
     if (search) params.append("search", search)
     if (sort) params.append("sort", sort)
     if (group && group !== "all") params.append("group", group)
-    
-    const query = params.toString()
-    return apiRequest(`/contacts${query ? `?${query}` : ""}`)
+    params.append("format", "columnar")
+    params.append("thumb", "128")
+
+    const data = await apiRequest(`/contacts?${params}`)
+    if (data.format === "columnar") {
+      return { contacts: fromColumnar(data.contacts, data.count) }
+    }
+    return data
+  },
+
+  getGroups: async () => {
+    return apiRequest("/contacts/groups")
   },
 
   create: async (contactData) => {
@@ -171,8 +194,24 @@ export const messagesAPI = {
   },
 
   getConversation: async (recipientEmail) => {
-    const params = new URLSearchParams({ recipientEmail })
-    return apiRequest(`/messages/conversation?${params}`)
+    const params = new URLSearchParams({ recipientEmail, format: "columnar" })
+    const data = await apiRequest(`/messages/conversation?${params}`)
+    if (data.format !== "columnar") {
+      return data
+    }
+    const users = data.users || {}
+    const messages = fromColumnar(data.messages, data.count).map((message) => {
+      const sender = users[message.senderId] || {}
+      const recipient = users[message.recipientId] || {}
+      return {
+        ...message,
+        senderName: sender.name,
+        senderEmail: sender.email,
+        recipientName: recipient.name,
+        recipientEmail: recipient.email,
+      }
+    })
+    return { messages }
   },
 
   getConversations: async () => {
@@ -194,6 +233,27 @@ export const messagesAPI = {
       method: "DELETE",
     })
   },
+
+  markManyAsRead: async (messageIds) => {
+    return apiRequest("/messages/bulk/read", {
+      method: "POST",
+      body: JSON.stringify({ ids: messageIds }),
+    })
+  },
+
+  markConversationAsRead: async (recipientEmail) => {
+    return apiRequest("/messages/conversation/read", {
+      method: "POST",
+      body: JSON.stringify({ recipientEmail }),
+    })
+  },
+
+  deleteMany: async (messageIds) => {
+    return apiRequest("/messages/bulk/delete", {
+      method: "POST",
+      body: JSON.stringify({ ids: messageIds }),
+    })
+  },
 }
 
 // Upload API